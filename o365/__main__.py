@@ -7,6 +7,35 @@ Unified command-line interface for managing Office365 email, calendar, and conta
 
 import sys
 import argparse
+import importlib
+
+
+# Command groups: name -> (module, help, subcommand help)
+COMMAND_GROUPS = {
+    'mail': ('mail', 'Manage email messages', 'Mail operations'),
+    'calendar': ('calendar', 'Manage calendar events', 'Calendar operations'),
+    'contacts': ('contacts', 'Manage contacts and user directory', 'Contacts operations'),
+    'chat': ('chat', 'Manage Teams chats', 'Chat operations'),
+    'files': ('files', 'Manage OneDrive and SharePoint files', 'File operations'),
+    'recordings': ('recordings', 'Manage Teams meeting recordings', 'Recording operations'),
+    'auth': ('auth', 'Manage OAuth2 authentication', 'Authentication operations'),
+    'config': ('config_cmd', 'Manage configuration settings', 'Configuration operations'),
+}
+
+
+def _requested_command(argv):
+    """Find the command group named on the command line
+
+    Args:
+        argv: Command-line arguments (without the program name)
+
+    Returns:
+        First non-option argument, or None if there is none
+    """
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg
+    return None
 
 
 def main():
@@ -36,37 +65,10 @@ For more help on a specific command:
     # Create subparsers for main command groups
     subparsers = parser.add_subparsers(dest='command', help='Command groups')
 
-    # Mail commands
-    mail_parser = subparsers.add_parser('mail', help='Manage email messages')
-    mail_subparsers = mail_parser.add_subparsers(dest='mail_command', help='Mail operations')
-
-    # Calendar commands
-    calendar_parser = subparsers.add_parser('calendar', help='Manage calendar events')
-    calendar_subparsers = calendar_parser.add_subparsers(dest='calendar_command', help='Calendar operations')
-
-    # Contacts commands
-    contacts_parser = subparsers.add_parser('contacts', help='Manage contacts and user directory')
-    contacts_subparsers = contacts_parser.add_subparsers(dest='contacts_command', help='Contacts operations')
-
-    # Chat commands
-    chat_parser = subparsers.add_parser('chat', help='Manage Teams chats')
-    chat_subparsers = chat_parser.add_subparsers(dest='chat_command', help='Chat operations')
-
-    # Files commands
-    files_parser = subparsers.add_parser('files', help='Manage OneDrive and SharePoint files')
-    files_subparsers = files_parser.add_subparsers(dest='files_command', help='File operations')
-
-    # Recordings commands
-    recordings_parser = subparsers.add_parser('recordings', help='Manage Teams meeting recordings')
-    recordings_subparsers = recordings_parser.add_subparsers(dest='recordings_command', help='Recording operations')
-
-    # Auth commands
-    auth_parser = subparsers.add_parser('auth', help='Manage OAuth2 authentication')
-    auth_subparsers = auth_parser.add_subparsers(dest='auth_command', help='Authentication operations')
-
-    # Config commands
-    config_parser = subparsers.add_parser('config', help='Manage configuration settings')
-    config_subparsers = config_parser.add_subparsers(dest='config_command', help='Configuration operations')
+    group_parsers = {}
+    for command, (module_name, group_help, operations_help) in COMMAND_GROUPS.items():
+        group_parser = subparsers.add_parser(command, help=group_help)
+        group_parsers[command] = (group_parser, module_name, operations_help)
 
     # MCP server command
     mcp_parser = subparsers.add_parser('mcp', help='Start MCP server for LLM integration')
@@ -77,18 +79,14 @@ For more help on a specific command:
         help='Logging level (default: INFO)'
     )
 
-    # Import and setup subcommands (lazy import to avoid loading all modules at startup)
-    from . import mail, calendar, contacts, chat, files, recordings, auth, config_cmd
-
-    # Setup each command group's subparsers
-    mail.setup_parser(mail_subparsers)
-    calendar.setup_parser(calendar_subparsers)
-    contacts.setup_parser(contacts_subparsers)
-    chat.setup_parser(chat_subparsers)
-    files.setup_parser(files_subparsers)
-    recordings.setup_parser(recordings_subparsers)
-    auth.setup_parser(auth_subparsers)
-    config_cmd.setup_parser(config_subparsers)
+    # Only import and set up the command group being invoked; the others are
+    # never parsed, and building every group's subcommands slows each startup
+    command = _requested_command(sys.argv[1:])
+    module = None
+    if command in group_parsers:
+        group_parser, module_name, operations_help = group_parsers[command]
+        module = importlib.import_module(f'.{module_name}', __package__)
+        module.setup_parser(group_parser.add_subparsers(dest=f'{command}_command', help=operations_help))
 
     # Parse arguments
     args = parser.parse_args()
@@ -99,53 +97,11 @@ For more help on a specific command:
         sys.exit(1)
 
     # Dispatch to command handlers
-    if args.command == 'mail':
-        if not args.mail_command:
-            mail_parser.print_help()
-            sys.exit(1)
-        mail.handle_command(args)
-
-    elif args.command == 'calendar':
-        if not args.calendar_command:
-            calendar_parser.print_help()
-            sys.exit(1)
-        calendar.handle_command(args)
-
-    elif args.command == 'contacts':
-        if not args.contacts_command:
-            contacts_parser.print_help()
-            sys.exit(1)
-        contacts.handle_command(args)
-
-    elif args.command == 'chat':
-        if not args.chat_command:
-            chat_parser.print_help()
-            sys.exit(1)
-        chat.handle_command(args)
-
-    elif args.command == 'files':
-        if not args.files_command:
-            files_parser.print_help()
-            sys.exit(1)
-        files.handle_command(args)
-
-    elif args.command == 'recordings':
-        if not args.recordings_command:
-            recordings_parser.print_help()
-            sys.exit(1)
-        recordings.handle_command(args)
-
-    elif args.command == 'auth':
-        if not args.auth_command:
-            auth_parser.print_help()
-            sys.exit(1)
-        auth.handle_command(args)
-
-    elif args.command == 'config':
-        if not args.config_command:
-            config_parser.print_help()
+    if args.command in group_parsers:
+        if not getattr(args, f'{args.command}_command', None):
+            group_parsers[args.command][0].print_help()
             sys.exit(1)
-        config_cmd.handle_command(args)
+        module.handle_command(args)
 
     elif args.command == 'mcp':
         # Import and run MCP server
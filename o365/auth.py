@@ -11,8 +11,8 @@ import urllib.error
 from datetime import datetime, timedelta
 
 from .common import (
-    CLIENT_ID, TENANT, SCOPES, TOKEN_FILE,
-    make_oauth_request, save_tokens, load_tokens
+    CLIENT_ID, TENANT, SCOPES_JOINED, TOKEN_FILE,
+    make_oauth_request, save_tokens, load_tokens, clear_account_caches
 )
 
 
@@ -22,7 +22,7 @@ def device_code_flow():
     # Step 1: Request device code
     device_code_data = make_oauth_request('/devicecode', {
         'client_id': CLIENT_ID,
-        'scope': ' '.join(SCOPES)
+        'scope': SCOPES_JOINED
     })
 
     print("\n" + "="*70)
@@ -54,8 +54,10 @@ def device_code_flow():
                 'device_code': device_code
             })
 
-            # Save tokens
+            # Save tokens; the login may be for another account, so data
+            # cached for the previous one is dropped
             save_tokens(tokens)
+            clear_account_caches()
 
             print("\n✓ Authentication successful!")
             print(f"✓ Tokens saved to {TOKEN_FILE}")
@@ -97,7 +99,7 @@ def refresh_token():
             'client_id': CLIENT_ID,
             'grant_type': 'refresh_token',
             'refresh_token': tokens['refresh_token'],
-            'scope': ' '.join(SCOPES)
+            'scope': SCOPES_JOINED
         })
 
         save_tokens(new_tokens)
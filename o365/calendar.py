@@ -15,6 +15,9 @@ from .contacts import search_users
 # Get local timezone
 LOCAL_TZ = datetime.now().astimezone().tzinfo
 
+# Fractional seconds beyond microseconds (Graph sends up to 7 digits)
+_FRAC_RE = re.compile(r'\.(\d{6})\d*')
+
 
 def parse_since_expression(timestring):
     """Parse git-style time expressions
@@ -103,11 +106,14 @@ def parse_since_expression(timestring):
 def parse_graph_datetime(dt_str):
     """Parse Microsoft Graph datetime format"""
     # Remove excess fractional seconds (keep max 6 digits)
-    dt_str = re.sub(r'\.(\d{6})\d*', r'.\1', dt_str)
-    # Handle timezone
-    if not dt_str.endswith('Z') and '+' not in dt_str and '-' not in dt_str[-6:]:
-        dt_str += 'Z'
-    return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    if '.' in dt_str:
+        dt_str = _FRAC_RE.sub(r'.\1', dt_str)
+    # Handle timezone; a 'Z' suffix is the common case
+    if dt_str[-1] == 'Z':
+        return datetime.fromisoformat(dt_str[:-1] + '+00:00')
+    if '+' not in dt_str and '-' not in dt_str[-6:]:
+        dt_str += '+00:00'
+    return datetime.fromisoformat(dt_str)
 
 
 def resolve_user(user_query, access_token):
@@ -16,23 +16,24 @@ from .calendar import parse_since_expression
 # Get local timezone
 LOCAL_TZ = datetime.now().astimezone().tzinfo
 
+# Fractional seconds, normalized to the 6 digits fromisoformat expects
+_FRAC_RE = re.compile(r'\.(\d+)')
+
 
 def parse_graph_datetime(dt_str):
     """Parse Microsoft Graph datetime format"""
     # Normalize fractional seconds to exactly 6 digits (pad or truncate)
-    match = re.search(r'\.(\d+)', dt_str)
-    if match:
-        frac_seconds = match.group(1)
-        if len(frac_seconds) > 6:
-            # Truncate to 6 digits
-            dt_str = re.sub(r'\.(\d{6})\d*', r'.\1', dt_str)
-        elif len(frac_seconds) < 6:
-            # Pad to 6 digits
-            dt_str = re.sub(r'\.(\d+)', lambda m: '.' + m.group(1).ljust(6, '0'), dt_str)
-    # Handle timezone
-    if not dt_str.endswith('Z') and '+' not in dt_str and '-' not in dt_str[-6:]:
-        dt_str += 'Z'
-    return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    if '.' in dt_str:
+        match = _FRAC_RE.search(dt_str)
+        if match and len(match.group(1)) != 6:
+            frac = match.group(1)[:6].ljust(6, '0')
+            dt_str = f"{dt_str[:match.start()]}.{frac}{dt_str[match.end():]}"
+    # Handle timezone; a 'Z' suffix is the common case
+    if dt_str[-1] == 'Z':
+        return datetime.fromisoformat(dt_str[:-1] + '+00:00')
+    if '+' not in dt_str and '-' not in dt_str[-6:]:
+        dt_str += '+00:00'
+    return datetime.fromisoformat(dt_str)
 
 
 def get_chats(access_token, count=50):
@@ -6,20 +6,55 @@ Shared constants, API helpers, and utility functions used across all commands.
 
 import json
 import sys
+import base64
 import os
+import shutil
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 import urllib.request
 import urllib.parse
 from pathlib import Path
-from configparser import ConfigParser
+
+from . import __version__
+
+# Use orjson for Graph JSON when it is installed (faster, and works on bytes
+# directly); otherwise fall back to the standard library
+try:
+    from orjson import loads as _json_loads, dumps as _json_dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
 
 # Graph API base URL
 GRAPH_API_BASE = "https://graph.microsoft.com/v1.0"
 
+# Identifies this client in Graph requests (Microsoft recommends a distinct
+# User-Agent so throttling and support cases can be traced to the app)
+GRAPH_USER_AGENT = f"o365-cli/{__version__}"
+
+# Maximum number of sub-requests Graph accepts in one JSON $batch call
+GRAPH_BATCH_LIMIT = 20
+
+# Throttled (429) Graph requests, and idempotent ones that hit a transient
+# server error, are retried up to GRAPH_RETRIES times. Each retry waits for
+# Retry-After when Graph sends it, else backs off from GRAPH_RETRY_DELAY seconds
+GRAPH_RETRIES = 3
+GRAPH_RETRY_DELAY = 0.5
+_SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+_IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+# Times a throttled (429) $batch sub-request is re-sent before giving up
+BATCH_THROTTLE_RETRIES = 3
+
 # Default configuration paths
 CONFIG_DIR = Path.home() / ".config" / "o365"
 CONFIG_FILE = CONFIG_DIR / "config"
 DEFAULT_TOKEN_FILE = CONFIG_DIR / "tokens.json"
 DEFAULT_MAIL_DIR = Path.home() / ".mail" / "office365"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "o365"
 
 # Default scopes (if not configured)
 DEFAULT_SCOPES = [
@@ -41,6 +76,127 @@ DEFAULT_SCOPES = [
 ]
 
 
+# Scopes enabled by each [scopes] command group
+_MAIL_SCOPES = (
+    "https://graph.microsoft.com/Mail.ReadWrite",
+    "https://graph.microsoft.com/Mail.Send",
+    "https://graph.microsoft.com/MailboxSettings.Read"
+)
+_CALENDAR_SCOPES = (
+    "https://graph.microsoft.com/Calendars.Read",
+    "https://graph.microsoft.com/Calendars.ReadWrite",
+    "https://graph.microsoft.com/Calendars.ReadWrite.Shared"
+)
+_CONTACTS_SCOPES = (
+    "https://graph.microsoft.com/Contacts.Read",
+    "https://graph.microsoft.com/Contacts.ReadWrite"
+)
+_CHAT_SCOPES = (
+    "https://graph.microsoft.com/Chat.Read",
+    "https://graph.microsoft.com/Chat.ReadWrite",
+    "https://graph.microsoft.com/ChatMessage.Send"
+)
+_FILES_SCOPES = (
+    "https://graph.microsoft.com/Files.Read",
+    "https://graph.microsoft.com/Files.ReadWrite"
+)
+_FILES_ALL_SCOPES = (
+    "https://graph.microsoft.com/Files.Read.All",
+    "https://graph.microsoft.com/Files.ReadWrite.All"
+)
+_SITES_ALL_SCOPES = (
+    "https://graph.microsoft.com/Sites.Read.All",
+    "https://graph.microsoft.com/Sites.ReadWrite.All"
+)
+_BASE_SCOPES = (
+    "https://graph.microsoft.com/User.Read",
+    "offline_access"
+)
+
+# Boolean values accepted in the config file (same as ConfigParser)
+_TRUE_VALUES = ('1', 'yes', 'true', 'on')
+_FALSE_VALUES = ('0', 'no', 'false', 'off')
+
+
+def _parse_ini(path):
+    """Parse a simple INI file into nested dicts
+
+    Handles the subset of ConfigParser syntax used by the config file:
+    [section] headers, "key = value" or "key: value" pairs, full-line
+    "#"/";" comments and indented continuation lines. Option names are
+    lowercased like ConfigParser does. configparser itself is only needed
+    by `o365 config`, which has to write the file back out.
+
+    Args:
+        path: Path to the INI file
+
+    Returns:
+        dict of section name -> {option: value}
+    """
+    sections = {}
+    current = None
+    key = None
+
+    with open(path, encoding='utf-8') as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line[0] in '#;':
+                continue
+
+            # Indented line continues the previous value
+            if raw[0] in ' \t' and current is not None and key is not None:
+                current[key] = f"{current[key]}\n{line}" if current[key] else line
+                continue
+
+            if line[0] == '[' and line[-1] == ']':
+                current = sections.setdefault(line[1:-1].strip(), {})
+                key = None
+                continue
+
+            if current is None:
+                continue
+
+            # Split on whichever delimiter comes first
+            eq, colon = line.find('='), line.find(':')
+            if eq == -1 or (colon != -1 and colon < eq):
+                eq = colon
+            if eq == -1:
+                key = None
+                continue
+            key = line[:eq].strip().lower()
+            current[key] = line[eq + 1:].strip()
+
+    return sections
+
+
+def _config_bool(section, option, default, section_name='scopes'):
+    """Read a boolean option from a parsed config section
+
+    Values that aren't booleans are reported on stderr and the default is
+    used, so a typo doesn't go unnoticed.
+
+    Args:
+        section: Dict of option -> raw string value
+        option: Option name
+        default: Value to use if the option is missing or not a boolean
+        section_name: Section name, for the warning
+
+    Returns:
+        bool
+    """
+    value = section.get(option)
+    if value is None:
+        return default
+    normalized = value.strip().lower()
+    if normalized in _TRUE_VALUES:
+        return True
+    if normalized in _FALSE_VALUES:
+        return False
+    print(f"Warning: Invalid boolean for [{section_name}] {option} in {CONFIG_FILE}: {value!r}; "
+          f"using default ({str(default).lower()})", file=sys.stderr)
+    return default
+
+
 def load_config():
     """
     Load configuration from environment variables and config file.
@@ -53,6 +209,7 @@ def load_config():
     - O365_SCOPES: Comma-separated list of scopes
     - O365_TOKEN_FILE: Path to token file
     - O365_MAIL_DIR: Path to local mail directory
+    - O365_CACHE_DIR: Path to cache directory
 
     Config file (~/.config/o365/config):
     [auth]
@@ -71,104 +228,92 @@ def load_config():
     [paths]
     token_file = ~/.config/o365/tokens.json
     mail_dir = ~/.mail/office365/
+    cache_dir = ~/.cache/o365
+
+    [cache]
+    # Keep messages read by ID on disk (off by default)
+    messages = false
 
     Returns:
-        dict with keys: client_id, tenant, scopes, token_file, mail_dir
+        dict with keys: client_id, tenant, scopes, token_file, mail_dir, cache_dir,
+        cache_messages
     """
     config = {
         'client_id': None,
         'tenant': None,
         'scopes': DEFAULT_SCOPES.copy(),
         'token_file': DEFAULT_TOKEN_FILE,
-        'mail_dir': DEFAULT_MAIL_DIR
+        'mail_dir': DEFAULT_MAIL_DIR,
+        'cache_dir': DEFAULT_CACHE_DIR,
+        'cache_messages': False
     }
 
     # Load from config file if it exists
     if CONFIG_FILE.exists():
-        parser = ConfigParser()
-        parser.read(CONFIG_FILE)
+        ini = _parse_ini(CONFIG_FILE)
 
         # Auth section
-        if parser.has_option('auth', 'client_id'):
-            config['client_id'] = parser.get('auth', 'client_id')
-        if parser.has_option('auth', 'tenant'):
-            config['tenant'] = parser.get('auth', 'tenant')
+        auth = ini.get('auth', {})
+        if 'client_id' in auth:
+            config['client_id'] = auth['client_id']
+        if 'tenant' in auth:
+            config['tenant'] = auth['tenant']
 
         # Scopes section
-        if parser.has_section('scopes'):
-            if parser.has_option('scopes', 'custom'):
+        if 'scopes' in ini:
+            sec = ini['scopes']
+
+            if 'custom' in sec:
                 # Custom scopes specified
-                custom_scopes = parser.get('scopes', 'custom')
-                config['scopes'] = [s.strip() for s in custom_scopes.split(',')]
+                config['scopes'] = [s.strip() for s in sec['custom'].split(',')]
             else:
                 # Build scopes from enabled command groups
                 scopes = []
 
-                if parser.getboolean('scopes', 'mail', fallback=True):
-                    scopes.extend([
-                        "https://graph.microsoft.com/Mail.ReadWrite",
-                        "https://graph.microsoft.com/Mail.Send",
-                        "https://graph.microsoft.com/MailboxSettings.Read"
-                    ])
-
-                if parser.getboolean('scopes', 'calendar', fallback=True):
-                    scopes.extend([
-                        "https://graph.microsoft.com/Calendars.Read",
-                        "https://graph.microsoft.com/Calendars.ReadWrite",
-                        "https://graph.microsoft.com/Calendars.ReadWrite.Shared"
-                    ])
-
-                if parser.getboolean('scopes', 'contacts', fallback=True):
-                    scopes.extend([
-                        "https://graph.microsoft.com/Contacts.Read",
-                        "https://graph.microsoft.com/Contacts.ReadWrite"
-                    ])
-
-                if parser.getboolean('scopes', 'chat', fallback=True):
-                    scopes.extend([
-                        "https://graph.microsoft.com/Chat.Read",
-                        "https://graph.microsoft.com/Chat.ReadWrite",
-                        "https://graph.microsoft.com/ChatMessage.Send"
-                    ])
+                if _config_bool(sec, 'mail', True):
+                    scopes.extend(_MAIL_SCOPES)
+
+                if _config_bool(sec, 'calendar', True):
+                    scopes.extend(_CALENDAR_SCOPES)
+
+                if _config_bool(sec, 'contacts', True):
+                    scopes.extend(_CONTACTS_SCOPES)
+
+                if _config_bool(sec, 'chat', True):
+                    scopes.extend(_CHAT_SCOPES)
 
                 # Files scopes: base scopes if files=true OR files.all=true
-                files_enabled = parser.getboolean('scopes', 'files', fallback=True)
-                files_all_enabled = parser.getboolean('scopes', 'files.all', fallback=False)
+                files_enabled = _config_bool(sec, 'files', True)
+                files_all_enabled = _config_bool(sec, 'files.all', False)
 
                 if files_enabled or files_all_enabled:
-                    scopes.extend([
-                        "https://graph.microsoft.com/Files.Read",
-                        "https://graph.microsoft.com/Files.ReadWrite"
-                    ])
+                    scopes.extend(_FILES_SCOPES)
 
                     # Optional .All scopes (may require admin consent)
                     if files_all_enabled:
-                        scopes.extend([
-                            "https://graph.microsoft.com/Files.Read.All",
-                            "https://graph.microsoft.com/Files.ReadWrite.All"
-                        ])
+                        scopes.extend(_FILES_ALL_SCOPES)
 
                 # Sites scopes: only if sites.all=true
-                if parser.getboolean('scopes', 'sites.all', fallback=False):
-                    scopes.extend([
-                        "https://graph.microsoft.com/Sites.Read.All",
-                        "https://graph.microsoft.com/Sites.ReadWrite.All"
-                    ])
+                if _config_bool(sec, 'sites.all', False):
+                    scopes.extend(_SITES_ALL_SCOPES)
 
                 # Always include User.Read and offline_access
-                scopes.extend([
-                    "https://graph.microsoft.com/User.Read",
-                    "offline_access"
-                ])
+                scopes.extend(_BASE_SCOPES)
 
                 if scopes:
                     config['scopes'] = scopes
 
         # Paths section
-        if parser.has_option('paths', 'token_file'):
-            config['token_file'] = Path(parser.get('paths', 'token_file')).expanduser()
-        if parser.has_option('paths', 'mail_dir'):
-            config['mail_dir'] = Path(parser.get('paths', 'mail_dir')).expanduser()
+        paths = ini.get('paths', {})
+        if 'token_file' in paths:
+            config['token_file'] = Path(paths['token_file']).expanduser()
+        if 'mail_dir' in paths:
+            config['mail_dir'] = Path(paths['mail_dir']).expanduser()
+        if 'cache_dir' in paths:
+            config['cache_dir'] = Path(paths['cache_dir']).expanduser()
+
+        # Cache section
+        config['cache_messages'] = _config_bool(ini.get('cache', {}), 'messages', False, 'cache')
 
     # Override with environment variables
     if os.environ.get('O365_CLIENT_ID'):
@@ -181,6 +326,8 @@ def load_config():
         config['token_file'] = Path(os.environ['O365_TOKEN_FILE']).expanduser()
     if os.environ.get('O365_MAIL_DIR'):
         config['mail_dir'] = Path(os.environ['O365_MAIL_DIR']).expanduser()
+    if os.environ.get('O365_CACHE_DIR'):
+        config['cache_dir'] = Path(os.environ['O365_CACHE_DIR']).expanduser()
 
     # Validate required fields
     if not config['client_id']:
@@ -206,8 +353,24 @@ _CONFIG = load_config()
 CLIENT_ID = _CONFIG['client_id']
 TENANT = _CONFIG['tenant']
 SCOPES = _CONFIG['scopes']
+SCOPES_JOINED = ' '.join(SCOPES)  # Space-separated form used in OAuth2 requests
 TOKEN_FILE = _CONFIG['token_file']
 MAIL_DIR = _CONFIG['mail_dir']
+CACHE_DIR = _CONFIG['cache_dir']
+CACHE_MESSAGES = _CONFIG['cache_messages']
+
+
+# Refresh access tokens this many seconds before they expire
+TOKEN_REFRESH_WINDOW = 300
+
+# Access tokens already loaded in this process: token file -> (token, expiry)
+_TOKEN_CACHE = {}
+
+
+def set_private_permissions(path):
+    """Restrict a file to owner read/write (0600), skipping the chmod if already set"""
+    if (path.stat().st_mode & 0o777) != 0o600:
+        path.chmod(0o600)
 
 
 def load_tokens():
@@ -216,8 +379,7 @@ def load_tokens():
         print("Error: OAuth2 tokens not found. Please run: o365 auth login", file=sys.stderr)
         sys.exit(1)
 
-    with open(TOKEN_FILE) as f:
-        return json.load(f)
+    return _json_loads(TOKEN_FILE.read_bytes())
 
 
 def save_tokens(tokens):
@@ -230,23 +392,127 @@ def save_tokens(tokens):
     tokens['_saved_at'] = time()
 
     TOKEN_FILE.write_text(json.dumps(tokens, indent=2))
-    TOKEN_FILE.chmod(0o600)
+    set_private_permissions(TOKEN_FILE)
+    _TOKEN_CACHE.pop(TOKEN_FILE, None)
+
+
+def read_cache(name, max_age):
+    """Load a JSON cache file if it is recent enough
+
+    Args:
+        name: Cache name (stored as CACHE_DIR/<name>.json)
+        max_age: Maximum age in seconds
+
+    Returns:
+        Cached data, or None if the cache is missing, stale or unreadable
+    """
+    from time import time
+
+    path = CACHE_DIR / f"{name}.json"
+    try:
+        if time() - path.stat().st_mtime > max_age:
+            return None
+        return _json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(name, data):
+    """Atomically write data to a JSON cache file
+
+    Failures are ignored; the cache is only an optimization.
+
+    Args:
+        name: Cache name (stored as CACHE_DIR/<name>.json; may contain '/')
+        data: JSON-serializable data
+    """
+    path = CACHE_DIR / f"{name}.json"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(_json_dumps(data))
+        set_private_permissions(tmp)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def prune_cache(name, max_age):
+    """Remove the expired files of a cache directory
+
+    Args:
+        name: Cache directory name (files stored as CACHE_DIR/<name>/*.json)
+        max_age: Maximum age in seconds
+    """
+    from time import time
+
+    cutoff = time() - max_age
+    for path in (CACHE_DIR / name).glob('*.json'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def clear_cache(name):
+    """Remove a JSON cache file if it exists
+
+    Args:
+        name: Cache name (stored as CACHE_DIR/<name>.json)
+    """
+    (CACHE_DIR / f"{name}.json").unlink(missing_ok=True)
+
+
+# Caches that hold the signed-in account's data: single cache files, and
+# directories of per-item cache files (see files.py and mail.py)
+ACCOUNT_CACHE_NAMES = ('drives', 'mail_folders', 'user_domain')
+ACCOUNT_CACHE_DIR_NAMES = ('messages',)
+
+
+def clear_account_caches():
+    """Remove the caches that belong to the signed-in account
+
+    Used when a new login may have switched accounts. Only the files this
+    package writes are removed; cache_dir may be shared with other data.
+    """
+    for name in ACCOUNT_CACHE_NAMES:
+        clear_cache(name)
+
+    for name in ACCOUNT_CACHE_DIR_NAMES:
+        directory = CACHE_DIR / name
+        for path in directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
 
 
 def get_access_token():
-    """Get the current access token, automatically refreshing if expired"""
+    """Get the current access token, automatically refreshing if expired
+
+    The token is remembered for the rest of the process until it enters the
+    refresh window, so repeated calls don't re-read tokens.json.
+    """
+    from time import time
+
+    cached = _TOKEN_CACHE.get(TOKEN_FILE)
+    if cached and time() < cached[1] - TOKEN_REFRESH_WINDOW:
+        return cached[0]
+
     tokens = load_tokens()
+    expires_at = None
 
     # Check if token is expired or close to expiring (within 5 minutes)
     if '_saved_at' in tokens and 'expires_in' in tokens:
-        from time import time
         saved_at = tokens['_saved_at']
         expires_in = tokens['expires_in']
-        time_elapsed = time() - saved_at
-        time_remaining = expires_in - time_elapsed
+        expires_at = saved_at + expires_in
+        time_remaining = expires_at - time()
 
         # If token expires in less than 5 minutes, refresh it
-        if time_remaining < 300:  # 5 minutes buffer
+        if time_remaining < TOKEN_REFRESH_WINDOW:
             if tokens.get('refresh_token'):
                 try:
                     # Attempt to refresh
@@ -254,10 +520,11 @@ def get_access_token():
                         'client_id': CLIENT_ID,
                         'grant_type': 'refresh_token',
                         'refresh_token': tokens['refresh_token'],
-                        'scope': ' '.join(SCOPES)
+                        'scope': SCOPES_JOINED
                     })
                     save_tokens(new_tokens)
                     tokens = new_tokens
+                    expires_at = time() + new_tokens.get('expires_in', 0)
                 except Exception:
                     # If refresh fails, continue with existing token
                     # (it might still work, or command will fail with proper error)
@@ -269,18 +536,166 @@ def get_access_token():
         print("Error: No access token found. Please run: o365 auth login", file=sys.stderr)
         sys.exit(1)
 
+    if expires_at is not None:
+        _TOKEN_CACHE[TOKEN_FILE] = (access_token, expires_at)
+
     return access_token
 
 
-def make_graph_request(url, access_token, method="GET", data=None):
+# Keep-alive HTTPS connections, one per host per thread
+_CONNECTIONS = threading.local()
+
+# Seconds a pooled connection waits on connect or on any single read before
+# giving up, so a stalled connection can't hang the CLI
+HTTP_TIMEOUT = 60
+
+# Read size used when pooled_request streams a body into a sink
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# Errors raised when reusing a connection the server has already closed
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError
+)
+
+
+def _open_connection(netloc):
+    """
+    Open an HTTPS connection to a host, through the proxy urllib would use
+
+    Honours HTTPS_PROXY/NO_PROXY and the system proxy settings the same way
+    urllib.request.urlopen does; a proxied connection is a CONNECT tunnel.
+
+    Args:
+        netloc: Target host, optionally with :port
+
+    Returns:
+        http.client.HTTPSConnection (not yet connected)
+    """
+    proxy = urllib.request.getproxies().get('https')
+    if not proxy or urllib.request.proxy_bypass(urllib.parse.urlsplit(f"//{netloc}").hostname):
+        return http.client.HTTPSConnection(netloc, timeout=HTTP_TIMEOUT)
+
+    if '://' not in proxy:
+        proxy = f"http://{proxy}"
+    proxy_parts = urllib.parse.urlsplit(proxy)
+    default_port = 443 if proxy_parts.scheme == 'https' else 80
+
+    tunnel_headers = {}
+    if proxy_parts.username:
+        credentials = urllib.parse.unquote(proxy_parts.username)
+        credentials += f":{urllib.parse.unquote(proxy_parts.password or '')}"
+        tunnel_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+
+    conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_parts.port or default_port,
+                                       timeout=HTTP_TIMEOUT)
+    conn.set_tunnel(netloc, headers=tunnel_headers)
+    return conn
+
+
+def pooled_request(method, url, headers=None, body=None, sink=None):
+    """
+    Send an HTTPS request over a reused keep-alive connection
+
+    Connections are kept per host and per thread, so repeated calls skip the
+    TCP and TLS handshakes. Proxy settings are honoured as by urllib (see
+    _open_connection). A request that fails because the server closed an
+    idle connection is retried once on a fresh connection. Redirects are not
+    followed.
+
+    Args:
+        method: HTTP method
+        url: Full https:// URL
+        headers: Optional dict of request headers
+        body: Optional request body (bytes or a binary file object)
+        sink: Optional binary file object; a successful (2xx) response body
+              is streamed into it instead of being returned
+
+    Returns:
+        Tuple of (status, response headers, response body bytes); the body
+        is b'' when it was written to sink
+    """
+    parts = urllib.parse.urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+    pool = getattr(_CONNECTIONS, 'pool', None)
+    if pool is None:
+        pool = _CONNECTIONS.pool = {}
+
+    while True:
+        conn = pool.get(parts.netloc)
+        reused = conn is not None
+        if not reused:
+            conn = pool[parts.netloc] = _open_connection(parts.netloc)
+
+        streaming = False
+        try:
+            conn.request(method, target, body=body, headers=headers or {})
+            response = conn.getresponse()
+            if sink is not None and 200 <= response.status < 300:
+                streaming = True
+                shutil.copyfileobj(response, sink, STREAM_BUFFER_SIZE)
+                data = b''
+            else:
+                data = response.read()
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            del pool[parts.netloc]
+            # Once part of the body is in sink the request can't be replayed
+            if not reused or streaming:
+                raise
+            if hasattr(body, 'seek'):
+                body.seek(0)
+            continue
+        except Exception:
+            conn.close()
+            del pool[parts.netloc]
+            raise
+
+        if response.will_close:
+            conn.close()
+            del pool[parts.netloc]
+
+        return response.status, response.headers, data
+
+
+def _should_retry(method, status):
+    """Check whether a Graph response status is worth retrying"""
+    return status == 429 or (status in _SERVER_ERROR_STATUSES and method in _IDEMPOTENT_METHODS)
+
+
+def retry_delay(headers, attempt):
+    """
+    Get the wait before retrying a throttled or failed Graph request
+
+    Args:
+        headers: Response headers (mapping); Retry-After is used when present
+        attempt: Number of the attempt that failed, starting at 0
+
+    Returns:
+        Delay in seconds
+    """
+    retry_after = str(headers.get('Retry-After', '')) if headers else ''
+    if retry_after.isdigit():
+        return int(retry_after)
+    return GRAPH_RETRY_DELAY * (2 ** attempt)
+
+
+def make_graph_request(url, access_token, method="GET", data=None, headers=None):
     """
     Make a request to Microsoft Graph API
 
+    Throttled requests (429), and GET/PUT/DELETE requests that fail with a
+    transient server error, are retried with backoff (see GRAPH_RETRIES).
+
     Args:
         url: Full URL or endpoint (if starts with /, prepends GRAPH_API_BASE)
         access_token: OAuth2 access token
         method: HTTP method (GET, POST, PATCH, DELETE)
         data: Optional data dict for POST/PATCH requests
+        headers: Optional dict of extra request headers (e.g. Prefer)
 
     Returns:
         Response data as dict, or None on error
@@ -289,35 +704,143 @@ def make_graph_request(url, access_token, method="GET", data=None):
     if url.startswith('/'):
         url = GRAPH_API_BASE + url
 
-    headers = {
+    request_headers = {
         'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        'User-Agent': GRAPH_USER_AGENT
     }
+    if headers:
+        request_headers.update(headers)
 
-    request_data = json.dumps(data).encode() if data else None
+    request_data = _json_dumps(data) if data else None
 
-    req = urllib.request.Request(url, data=request_data, headers=headers, method=method)
+    for attempt in range(GRAPH_RETRIES + 1):
+        status, response_headers, body = pooled_request(method, url, request_headers, request_data)
+        if attempt == GRAPH_RETRIES or not _should_retry(method, status):
+            break
+        from time import sleep
+        sleep(retry_delay(response_headers, attempt))
 
-    try:
-        with urllib.request.urlopen(req) as response:
-            body = response.read()
-            # DELETE requests typically return empty responses
-            if not body:
-                return {}
-            return json.loads(body)
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
+    if status >= 400:
+        error_body = body.decode(errors='replace')
 
         # Special handling for authentication errors
-        if e.code == 401:
+        if status == 401:
             print(f"\nError: Authentication failed (401 Unauthorized)", file=sys.stderr)
             print(f"Your access token may have expired or is invalid.", file=sys.stderr)
             print(f"\nPlease re-authenticate with: o365 auth login\n", file=sys.stderr)
         else:
-            print(f"Graph API Error: {e.code} - {error_body}", file=sys.stderr)
+            print(f"Graph API Error: {status} - {error_body}", file=sys.stderr)
 
         return None
 
+    # DELETE requests typically return empty responses
+    if not body:
+        return {}
+    return _json_loads(body)
+
+
+# Background thread(s) that fetch the next page of a collection; created on
+# first use and kept for the process so their pooled connections are reused
+_PREFETCH_EXECUTOR = None
+_PREFETCH_LOCK = threading.Lock()
+
+
+def _get_prefetch_executor():
+    """Return the shared page-prefetch executor, creating it on first use"""
+    global _PREFETCH_EXECUTOR
+    with _PREFETCH_LOCK:
+        if _PREFETCH_EXECUTOR is None:
+            _PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='o365-prefetch')
+        return _PREFETCH_EXECUTOR
+
+
+def submit_prefetch(fn, *args, **kwargs):
+    """
+    Run a request function in the background on the shared prefetch executor
+
+    Args:
+        fn: Callable to run
+        *args, **kwargs: Arguments for fn
+
+    Returns:
+        concurrent.futures.Future for the call
+    """
+    return _get_prefetch_executor().submit(fn, *args, **kwargs)
+
+
+def iter_graph_pages(url, access_token):
+    """
+    Iterate over the pages of a paginated Graph collection
+
+    The request for the next page (@odata.nextLink) is sent in the
+    background as soon as a page arrives, so it is already in flight while
+    the caller processes the current one.
+
+    Args:
+        url: Full URL or endpoint of the first page
+        access_token: OAuth2 access token
+
+    Yields:
+        Response dicts, one per page (stops at the first failed request)
+    """
+    result = make_graph_request(url, access_token)
+
+    while result:
+        next_url = result.get('@odata.nextLink')
+        future = None
+        if next_url:
+            future = submit_prefetch(make_graph_request, next_url, access_token)
+
+        yield result
+
+        result = future.result() if future else None
+
+
+def graph_batch(requests, access_token):
+    """
+    Send several Graph requests through JSON batching ($batch)
+
+    Requests are sent GRAPH_BATCH_LIMIT at a time, one POST per group.
+
+    Args:
+        requests: List of dicts with 'id' and 'url' keys, plus optional 'method'
+                  (default GET), 'body' and 'headers'. URLs may be full Graph
+                  URLs (e.g. @odata.nextLink values) or paths relative to
+                  GRAPH_API_BASE.
+        access_token: OAuth2 access token
+
+    Returns:
+        Dict of request id (as str) -> sub-response dict with 'status',
+        'headers' and 'body' keys. Requests whose batch POST failed are
+        missing from the result.
+    """
+    responses = {}
+
+    for start in range(0, len(requests), GRAPH_BATCH_LIMIT):
+        batch = []
+        for request in requests[start:start + GRAPH_BATCH_LIMIT]:
+            sub_request = {
+                'id': str(request['id']),
+                'method': request.get('method', 'GET'),
+                'url': request['url'].removeprefix(GRAPH_API_BASE)
+            }
+            if 'body' in request:
+                sub_request['body'] = request['body']
+                sub_request['headers'] = {'Content-Type': 'application/json'}
+            if 'headers' in request:
+                sub_request['headers'] = {**sub_request.get('headers', {}), **request['headers']}
+            batch.append(sub_request)
+
+        result = make_graph_request('/$batch', access_token, method='POST', data={'requests': batch})
+        if not result:
+            continue
+
+        for response in result.get('responses', []):
+            responses[response['id']] = response
+
+    return responses
+
 
 def make_oauth_request(endpoint, data):
     """
@@ -339,4 +862,4 @@ def make_oauth_request(endpoint, data):
     )
 
     with urllib.request.urlopen(req) as response:
-        return json.loads(response.read())
+        return _json_loads(response.read())
@@ -7,15 +7,15 @@ Manage configuration file settings.
 import sys
 from pathlib import Path
 from configparser import ConfigParser
-from .common import CONFIG_FILE, CONFIG_DIR
+from .common import CONFIG_FILE, CONFIG_DIR, set_private_permissions
 
 
 def ensure_config_exists():
     """Ensure config file exists, create if needed"""
     if not CONFIG_FILE.exists():
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        CONFIG_FILE.touch()
-        CONFIG_FILE.chmod(0o600)
+        CONFIG_FILE.touch(mode=0o600)
+        set_private_permissions(CONFIG_FILE)
     return CONFIG_FILE
 
 
@@ -32,7 +32,7 @@ def save_config_parser(parser):
     ensure_config_exists()
     with open(CONFIG_FILE, 'w') as f:
         parser.write(f)
-    CONFIG_FILE.chmod(0o600)
+    set_private_permissions(CONFIG_FILE)
 
 
 def parse_key(key):
@@ -11,7 +11,8 @@ from .common import get_access_token, make_graph_request, GRAPH_API_BASE
 def get_contacts(access_token):
     """Get all personal contacts"""
     contacts = []
-    url = f"{GRAPH_API_BASE}/me/contacts?$top=999"
+    # Only request the fields we use - full contact records are much larger
+    url = f"{GRAPH_API_BASE}/me/contacts?$top=999&$select=id,displayName,emailAddresses"
 
     while url:
         result = make_graph_request(url, access_token)
@@ -39,7 +40,7 @@ def get_contacts(access_token):
 def get_calendar_owners(access_token):
     """Get owners of shared calendars"""
     owners = []
-    url = f"{GRAPH_API_BASE}/me/calendars"
+    url = f"{GRAPH_API_BASE}/me/calendars?$select=owner"
 
     result = make_graph_request(url, access_token)
     if not result:
@@ -6,13 +6,122 @@ List, search, download, upload, and share files across personal OneDrive and sha
 
 import sys
 import os
+import re
+import json
+import base64
+import time
+import http.client
 import urllib.request
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from datetime import datetime
 from pathlib import Path
 
-from .common import get_access_token, make_graph_request, GRAPH_API_BASE
+from .common import (
+    get_access_token, make_graph_request, iter_graph_pages, graph_batch, pooled_request,
+    read_cache, write_cache, retry_delay, GRAPH_API_BASE, GRAPH_BATCH_LIMIT, BATCH_THROTTLE_RETRIES
+)
 from .calendar import parse_since_expression
 
+# Upload responses are parsed with orjson when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# Files at or above this size are uploaded through an upload session
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+
+# Upload session fragment size (Graph requires a multiple of 320 KiB)
+UPLOAD_CHUNK_SIZE = 32 * 320 * 1024  # 10 MiB
+
+# Attempts per upload fragment before a session upload is abandoned; waits
+# between attempts back off exponentially from UPLOAD_RETRY_DELAY seconds
+UPLOAD_RETRIES = 4
+UPLOAD_RETRY_DELAY = 1.0
+
+# Fractional seconds beyond microseconds (Graph sends up to 7 digits)
+_FRAC_RE = re.compile(r'\.(\d{6})\d*')
+
+# Drive lookup indexes per access token (see _get_drive_index)
+_DRIVE_INDEX_CACHE = {}
+
+# Drive IDs are stable, so the drive list is also kept on disk between runs
+DRIVES_CACHE_NAME = 'drives'
+DRIVES_CACHE_TTL = 24 * 60 * 60
+
+# Personal OneDrive drive ID (16 hex digits)
+_PERSONAL_DRIVE_ID_RE = re.compile(r'[0-9a-fA-F]{16}')
+
+# Item fields used by listings, search and downloads (trims each response)
+_ITEM_SELECT = ('id,name,size,file,folder,lastModifiedDateTime,webUrl,parentReference,'
+                '@microsoft.graph.downloadUrl')
+
+# Narrower field sets for the CLI tables; id, name and folder are always
+# needed to walk into subfolders
+LIST_SELECT = ('id', 'name', 'size', 'folder', 'lastModifiedDateTime')
+SEARCH_SELECT = LIST_SELECT + ('parentReference',)
+
+# Drive fields used by the drive listing, name resolution and structured output
+_DRIVE_SELECT = 'id,name,driveType,owner,webUrl'
+
+# quickXorHash: 160-bit result; byte i lands at rotation (i * 11) % 160, so
+# input is folded into 160 bytes (one per rotation slot) before rotating
+_QXH_BITS = 160
+_QXH_MASK = (1 << _QXH_BITS) - 1
+_QXH_FOLD = 160
+
+# Shared empty mapping for missing nested objects (never mutated)
+_EMPTY = {}
+
+# Prefix of parentReference.path for items in the personal drive root
+_DRIVE_ROOT_PREFIX = '/drive/root:'
+
+# Read buffer size for each parallel range download
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Statuses the /content endpoint uses to point at the actual file
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Files at or above this size are downloaded as parallel byte ranges
+DOWNLOAD_RANGE_THRESHOLD = 16 * 1024 * 1024
+DOWNLOAD_RANGE_SIZE = 8 * 1024 * 1024
+DOWNLOAD_WORKERS = 8
+
+# Personal drive object per access token (cached for the process lifetime)
+_PERSONAL_DRIVE_CACHE = {}
+
+# Bytes urllib.parse.quote(path) would percent-encode (it keeps '/')
+_UNSAFE_PATH_BYTES_RE = re.compile(rb'[^A-Za-z0-9_.\-~/]')
+
+# Units for format_size, one per power of 1024
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Listing rows are written to stdout in blocks of this many lines (one
+# default Graph page), so output still streams without a write per row
+OUTPUT_BLOCK_ROWS = 200
+
+
+def get_personal_drive(access_token):
+    """Get the personal OneDrive drive object, cached per access token
+
+    Failed lookups are not cached.
+
+    Args:
+        access_token: OAuth2 access token
+
+    Returns:
+        Drive object or None on error
+    """
+    drive = _PERSONAL_DRIVE_CACHE.get(access_token)
+    if drive is None:
+        drive = make_graph_request('/me/drive', access_token)
+        if drive:
+            _PERSONAL_DRIVE_CACHE[access_token] = drive
+    return drive
+
 
 def get_drives(access_token):
     """Get all available drives (personal OneDrive and shared sites)
@@ -23,59 +132,106 @@ def get_drives(access_token):
     Returns:
         List of drive objects
     """
-    drives = []
+    # Drives keyed by ID; the first occurrence wins, which deduplicates the
+    # personal drive when /me/drives lists it again
+    drives = {}
 
     # Get personal OneDrive
-    personal_drive = make_graph_request('/me/drive', access_token)
+    personal_drive = get_personal_drive(access_token)
     if personal_drive:
-        drives.append(personal_drive)
+        drives[personal_drive['id']] = personal_drive
 
     # Get all accessible drives (includes shared sites)
-    url = f"{GRAPH_API_BASE}/me/drives"
+    for result in iter_graph_pages(f"{GRAPH_API_BASE}/me/drives?$select={_DRIVE_SELECT}", access_token):
+        for drive in result.get('value', []):
+            drives.setdefault(drive['id'], drive)
 
-    while url:
-        result = make_graph_request(url, access_token)
-        if not result:
-            break
+    return list(drives.values())
 
-        drives.extend(result.get('value', []))
-        url = result.get('@odata.nextLink')
 
-    # Deduplicate by ID
-    seen_ids = set()
-    unique_drives = []
-    for drive in drives:
-        if drive['id'] not in seen_ids:
-            seen_ids.add(drive['id'])
-            unique_drives.append(drive)
+def get_drives_cached(access_token, refresh=False):
+    """Get all available drives, using the on-disk drive cache when fresh
 
-    return unique_drives
+    Args:
+        access_token: OAuth2 access token
+        refresh: Ignore the cache and fetch the drive list from Graph
+
+    Returns:
+        List of drive objects
+    """
+    drives = None if refresh else read_cache(DRIVES_CACHE_NAME, DRIVES_CACHE_TTL)
+    if drives is None:
+        drives = get_drives(access_token)
+        # Don't cache an empty result (likely a failed request)
+        if drives:
+            write_cache(DRIVES_CACHE_NAME, drives)
+    return drives
+
+
+def _get_drive_index(access_token, refresh=False):
+    """Get lookup indexes over all drives, fetching the drive list once per token
 
+    Args:
+        access_token: OAuth2 access token
+        refresh: Ignore cached drive lists and fetch from Graph
 
-def resolve_drive(drive_query, access_token):
+    Returns:
+        Tuple of (dict of drive ID -> drive, list of (lowercase name, drive))
+    """
+    index = None if refresh else _DRIVE_INDEX_CACHE.get(access_token)
+    if index is None:
+        drives = get_drives_cached(access_token, refresh)
+        index = (
+            {drive['id']: drive for drive in drives},
+            [(drive.get('name', '').lower(), drive) for drive in drives]
+        )
+        if drives:
+            _DRIVE_INDEX_CACHE[access_token] = index
+    return index
+
+
+def _looks_like_drive_id(value):
+    """Check whether a string has the shape of a Graph drive ID
+
+    Business/SharePoint drive IDs start with "b!"; personal OneDrive IDs are
+    16 hex digits.
+    """
+    return value.startswith('b!') or _PERSONAL_DRIVE_ID_RE.fullmatch(value) is not None
+
+
+def resolve_drive(drive_query, access_token, refresh=False):
     """Resolve a drive name or ID to a drive object
 
+    Names are matched against the cached drive list; if nothing matches, the
+    list is fetched again in case the drive is new.
+
     Args:
         drive_query: Drive name (fuzzy match) or ID
         access_token: OAuth2 access token
+        refresh: Ignore cached drive lists and fetch from Graph
 
     Returns:
         Drive object or None if not found
     """
-    drives = get_drives(access_token)
-
-    # Try exact ID match first
-    for drive in drives:
-        if drive['id'] == drive_query:
+    # Drive IDs can be fetched directly instead of enumerating every drive
+    if _looks_like_drive_id(drive_query):
+        drive = make_graph_request(f'/drives/{drive_query}', access_token)
+        if drive:
             return drive
 
-    # Try fuzzy name match
     query_lower = drive_query.lower()
-    matches = []
-    for drive in drives:
-        name = drive.get('name', '').lower()
-        if query_lower in name:
-            matches.append(drive)
+
+    for reload in ((True,) if refresh else (False, True)):
+        drives_by_id, drive_names = _get_drive_index(access_token, reload)
+
+        # Try exact ID match first
+        if drive_query in drives_by_id:
+            return drives_by_id[drive_query]
+
+        # Try fuzzy name match
+        matches = [drive for name, drive in drive_names if query_lower in name]
+        if matches:
+            break
 
     if len(matches) == 1:
         return matches[0]
@@ -89,7 +245,269 @@ def resolve_drive(drive_query, access_token):
     return None
 
 
-def list_files(access_token, path='/', drive_id=None, recursive=False, since=None):
+def _drive_path(drive_id=None):
+    """Graph path for a drive, relative to GRAPH_API_BASE
+
+    Without a drive ID the personal OneDrive is addressed as /me/drive,
+    which saves looking up its ID first.
+    """
+    return f"/drives/{drive_id}" if drive_id else "/me/drive"
+
+
+def _quote_path(path):
+    """Percent-encode a drive path for use in a Graph URL
+
+    Equivalent to urllib.parse.quote(path), but most names need no escaping
+    at all and are returned after a single regex scan.
+
+    Args:
+        path: Drive path
+
+    Returns:
+        URL-safe path string
+    """
+    raw = path.encode('utf-8')
+    if _UNSAFE_PATH_BYTES_RE.search(raw) is None:
+        return path
+    return _UNSAFE_PATH_BYTES_RE.sub(lambda m: b'%%%02X' % m[0][0], raw).decode('ascii')
+
+
+def _select_param(select=None):
+    """Value for a driveItem $select option
+
+    Args:
+        select: Iterable of field names, or None for all fields the module uses
+    """
+    return ','.join(select) if select else _ITEM_SELECT
+
+
+def _children_url(drive_id, path, item_id=None, select=None):
+    """Graph path listing the children of a folder
+
+    A known item ID is used in preference to the path, which Graph would
+    otherwise have to resolve segment by segment.
+    """
+    fields = _select_param(select)
+    if item_id:
+        return f"{_drive_path(drive_id)}/items/{item_id}/children?$select={fields}"
+    if path == '/' or path == '':
+        return f"{_drive_path(drive_id)}/root/children?$select={fields}"
+    encoded_path = _quote_path(path.strip('/'))
+    return f"{_drive_path(drive_id)}/root:/{encoded_path}:/children?$select={fields}"
+
+
+def _prepare_items(items, since=None):
+    """Filter a page of items by since and classify them once
+
+    Each kept item gets item['_type'] set to 'folder' or 'file', so the
+    traversal, structured conversion and CLI output don't re-check.
+
+    Args:
+        items: List of item objects from one response page
+        since: Optional datetime to filter items modified since
+
+    Returns:
+        List of kept item objects
+    """
+    if since:
+        items = [item for item in items
+                 if 'lastModifiedDateTime' in item and
+                 parse_graph_datetime(item['lastModifiedDateTime']) >= since]
+    for item in items:
+        item['_type'] = 'folder' if 'folder' in item else 'file'
+    return items
+
+
+def _list_one_folder(access_token, drive_id, path, since=None, item_id=None, select=None):
+    """Fetch all children of a single folder, following pagination
+
+    Args:
+        access_token: OAuth2 access token
+        drive_id: Drive ID (None for personal OneDrive)
+        path: Folder path ('/' for root)
+        since: Optional datetime to filter items modified since
+        item_id: Optional folder item ID (addresses the folder instead of path)
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Returns:
+        List of item objects
+    """
+    return list(_iter_one_folder(access_token, drive_id, path, since, item_id, select))
+
+
+def _iter_one_folder(access_token, drive_id, path, since=None, item_id=None, select=None):
+    """Yield the children of a single folder page by page
+
+    Args:
+        access_token: OAuth2 access token
+        drive_id: Drive ID (None for personal OneDrive)
+        path: Folder path ('/' for root)
+        since: Optional datetime to filter items modified since
+        item_id: Optional folder item ID (addresses the folder instead of path)
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Yields:
+        Item objects, as soon as the page containing them arrives
+    """
+    for result in iter_graph_pages(_children_url(drive_id, path, item_id, select), access_token):
+        yield from _prepare_items(result.get('value', []), since)
+
+
+def _list_children_batch(access_token, drive_id, paths, since=None, item_ids=None, select=None):
+    """Fetch the children of several folders using Graph $batch requests
+
+    Every folder's first page goes out in a single batch; further pages are
+    batched together in follow-up rounds. Sub-requests throttled with 429
+    are re-queued for the next round after their Retry-After delay (or a
+    backoff delay when Graph sends none, see retry_delay).
+
+    Args:
+        access_token: OAuth2 access token
+        drive_id: Drive ID (None for personal OneDrive)
+        paths: List of folder paths
+        since: Optional datetime to filter items modified since
+        item_ids: Optional list of folder item IDs matching paths (None
+                  entries fall back to the path)
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Returns:
+        List of (path, items) tuples in the same order as paths
+    """
+    item_ids = item_ids or [None] * len(paths)
+    children = {str(i): [] for i in range(len(paths))}
+    urls = {str(i): _children_url(drive_id, path, item_id, select)
+            for i, (path, item_id) in enumerate(zip(paths, item_ids))}
+    throttled = {}
+
+    while urls:
+        responses = graph_batch([{'id': i, 'url': url} for i, url in urls.items()], access_token)
+
+        next_urls = {}
+        delay = 0
+        for i in urls:
+            response = responses.get(i)
+            if not response:
+                continue
+            if response.get('status') == 429 and throttled.get(i, 0) < BATCH_THROTTLE_RETRIES:
+                delay = max(delay, retry_delay(response.get('headers'), throttled.get(i, 0)))
+                throttled[i] = throttled.get(i, 0) + 1
+                next_urls[i] = urls[i]
+                continue
+            if response.get('status') != 200:
+                print(f"Graph API Error: {response.get('status')} - {json.dumps(response.get('body'))}",
+                      file=sys.stderr)
+                continue
+
+            body = response.get('body', {})
+            children[i].extend(_prepare_items(body.get('value', []), since))
+            if body.get('@odata.nextLink'):
+                next_urls[i] = body['@odata.nextLink']
+
+        urls = next_urls
+        if delay:
+            time.sleep(delay)
+
+    return [(path, children[str(i)]) for i, path in enumerate(paths)]
+
+
+def _child_path(path, name):
+    """Join a folder path and a child name"""
+    path = path.strip('/')
+    return f"{path}/{name}" if path else f"/{name}"
+
+
+def _list_folders(access_token, drive_id, folders, since=None, select=None):
+    """List one folder directly, or several through $batch
+
+    Args:
+        access_token: OAuth2 access token
+        drive_id: Drive ID (None for personal OneDrive)
+        folders: Non-empty list of (path, item ID or None) tuples
+        since: Optional datetime to filter items modified since
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Returns:
+        List of (path, items) tuples in the same order as folders
+    """
+    paths, item_ids = zip(*folders)
+    if len(paths) == 1:
+        return [(paths[0], _list_one_folder(access_token, drive_id, paths[0], since,
+                                            item_id=item_ids[0], select=select))]
+    return _list_children_batch(access_token, drive_id, list(paths), since, list(item_ids), select)
+
+
+def _walk_folders(access_token, path='/', drive_id=None, since=None, select=None):
+    """Walk a folder tree depth-first, listing each folder once
+
+    Uses an explicit stack of pending folder paths, so memory stays bounded
+    by tree depth rather than tree size; up to GRAPH_BATCH_LIMIT pending
+    folders are listed per $batch request. The next group of folders is
+    requested in the background before the current one is yielded, so its
+    round-trip overlaps with the caller's processing. That listing runs on
+    the walk's own worker thread rather than the shared prefetch executor,
+    since it waits on page prefetches submitted to that executor.
+
+    Args:
+        access_token: OAuth2 access token
+        path: Path of the top folder
+        drive_id: Drive ID (default: personal OneDrive)
+        since: Optional datetime to filter items modified since
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Yields:
+        (folder_path, children) tuples
+    """
+    def pop_pending():
+        # Take the most recently discovered folders first (depth-first)
+        return [stack.pop() for _ in range(min(len(stack), GRAPH_BATCH_LIMIT))]
+
+    # Subfolders are addressed by item ID, so their paths need no encoding
+    # or server-side resolution
+    stack = [(path, None)]
+    listings = _list_folders(access_token, drive_id, pop_pending(), since, select)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='o365-walk')
+
+    try:
+        while listings:
+            for folder_path, children in listings:
+                subfolders = [(_child_path(folder_path, child['name']), child.get('id'))
+                              for child in children if child['_type'] == 'folder']
+                stack.extend(reversed(subfolders))
+
+            future = (executor.submit(_list_folders, access_token, drive_id, pop_pending(), since, select)
+                      if stack else None)
+
+            yield from listings
+
+            listings = future.result() if future else None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def list_files_recursive(access_token, path='/', drive_id=None, since=None, select=None):
+    """List files and folders in a path and all of its subfolders
+
+    Args:
+        access_token: OAuth2 access token
+        path: Path to list (default: root)
+        drive_id: Drive ID (default: personal OneDrive)
+        since: Optional datetime to filter files modified since
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Yields:
+        Item objects, as each folder is listed
+    """
+    for _, children in _walk_folders(access_token, path, drive_id, since, select):
+        yield from children
+
+
+def list_files(access_token, path='/', drive_id=None, recursive=False, since=None, select=None):
     """List files and folders in a path
 
     Args:
@@ -98,53 +516,40 @@ def list_files(access_token, path='/', drive_id=None, recursive=False, since=Non
         drive_id: Drive ID (default: personal OneDrive)
         recursive: List subdirectories recursively
         since: Optional datetime to filter files modified since
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
 
     Returns:
-        List of item objects
+        Iterable of item objects: a list for a single folder, or a lazy
+        generator (see list_files_recursive) when recursive
     """
-    # Get personal drive if not specified
-    if not drive_id:
-        personal_drive = make_graph_request('/me/drive', access_token)
-        if not personal_drive:
-            return []
-        drive_id = personal_drive['id']
-
-    # Build URL for path
-    if path == '/' or path == '':
-        url = f"{GRAPH_API_BASE}/drives/{drive_id}/root/children"
-    else:
-        # Remove leading/trailing slashes
-        path = path.strip('/')
-        encoded_path = urllib.parse.quote(path)
-        url = f"{GRAPH_API_BASE}/drives/{drive_id}/root:/{encoded_path}:/children"
-
-    items = []
+    if recursive:
+        return list_files_recursive(access_token, path, drive_id, since, select)
+    return _list_one_folder(access_token, drive_id, path, since, select=select)
 
-    while url:
-        result = make_graph_request(url, access_token)
-        if not result:
-            break
 
-        batch = result.get('value', [])
+def iter_files(access_token, path='/', drive_id=None, recursive=False, since=None, select=None):
+    """Lazily list files and folders in a path
 
-        # Apply since filter if specified
-        if since:
-            batch = [item for item in batch
-                    if 'lastModifiedDateTime' in item and
-                    parse_graph_datetime(item['lastModifiedDateTime']) >= since]
+    Unlike list_files, a single folder is not collected into a list first,
+    so callers can handle each page of items as it arrives.
 
-        items.extend(batch)
-        url = result.get('@odata.nextLink')
+    Args:
+        access_token: OAuth2 access token
+        path: Path to list (default: root)
+        drive_id: Drive ID (default: personal OneDrive)
+        recursive: List subdirectories recursively
+        since: Optional datetime to filter files modified since
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
 
-    # Recursive listing
+    Yields:
+        Item objects
+    """
     if recursive:
-        folders = [item for item in items if 'folder' in item]
-        for folder in folders:
-            folder_path = f"{path}/{folder['name']}" if path != '/' else f"/{folder['name']}"
-            sub_items = list_files(access_token, folder_path, drive_id, recursive, since)
-            items.extend(sub_items)
-
-    return items
+        yield from list_files_recursive(access_token, path, drive_id, since, select)
+    else:
+        yield from _iter_one_folder(access_token, drive_id, path, since, select=select)
 
 
 def parse_graph_datetime(dt_str):
@@ -156,17 +561,18 @@ def parse_graph_datetime(dt_str):
     Returns:
         datetime object
     """
-    from datetime import datetime
     # Remove excess fractional seconds (keep max 6 digits)
-    import re
-    dt_str = re.sub(r'\.(\d{6})\d*', r'.\1', dt_str)
-    # Handle timezone
-    if not dt_str.endswith('Z') and '+' not in dt_str and '-' not in dt_str[-6:]:
-        dt_str += 'Z'
-    return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    if '.' in dt_str:
+        dt_str = _FRAC_RE.sub(r'.\1', dt_str)
+    # Graph almost always returns UTC with a 'Z' suffix
+    if dt_str[-1] == 'Z':
+        return datetime.fromisoformat(dt_str[:-1] + '+00:00')
+    if '+' not in dt_str and '-' not in dt_str[-6:]:
+        dt_str += '+00:00'
+    return datetime.fromisoformat(dt_str)
 
 
-def search_files(access_token, query, drive_id=None, file_type=None, since=None, count=50):
+def search_files(access_token, query, drive_id=None, file_type=None, since=None, count=50, select=None):
     """Search for files across OneDrive and SharePoint
 
     Args:
@@ -176,23 +582,39 @@ def search_files(access_token, query, drive_id=None, file_type=None, since=None,
         file_type: Optional file extension filter (pdf, xlsx, docx, etc.)
         since: Optional datetime to filter files modified since
         count: Maximum results to return
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
 
     Returns:
         List of item objects
     """
-    # Build search URL
-    if drive_id:
-        url = f"{GRAPH_API_BASE}/drives/{drive_id}/root/search(q='{query}')"
-    else:
-        url = f"{GRAPH_API_BASE}/me/drive/root/search(q='{query}')"
+    return list(iter_search_files(access_token, query, drive_id, file_type, since, count, select))
 
-    items = []
 
-    while url:
-        result = make_graph_request(url, access_token)
-        if not result:
-            break
+def iter_search_files(access_token, query, drive_id=None, file_type=None, since=None, count=50, select=None):
+    """Lazily search for files across OneDrive and SharePoint
 
+    Args:
+        access_token: OAuth2 access token
+        query: Search query (filename or content)
+        drive_id: Optional drive ID to limit search
+        file_type: Optional file extension filter (pdf, xlsx, docx, etc.)
+        since: Optional datetime to filter files modified since
+        count: Maximum results to return
+        select: Optional iterable of item fields to request (default: all
+                fields used by this module)
+
+    Yields:
+        Item objects, as soon as the page containing them arrives
+    """
+    # Build search URL (the since filter stays client-side: driveItem
+    # collections don't support $filter on lastModifiedDateTime)
+    url = (f"{GRAPH_API_BASE}{_drive_path(drive_id)}/root/search(q='{query}')"
+           f"?$select={_select_param(select)}&$top={count}")
+
+    remaining = count
+
+    for result in iter_graph_pages(url, access_token):
         batch = result.get('value', [])
 
         # Apply file type filter
@@ -200,61 +622,198 @@ def search_files(access_token, query, drive_id=None, file_type=None, since=None,
             extension = file_type if file_type.startswith('.') else f'.{file_type}'
             batch = [item for item in batch if item.get('name', '').lower().endswith(extension.lower())]
 
-        # Apply since filter
-        if since:
-            batch = [item for item in batch
-                    if 'lastModifiedDateTime' in item and
-                    parse_graph_datetime(item['lastModifiedDateTime']) >= since]
+        # Apply since filter, respecting the count limit
+        batch = _prepare_items(batch, since)[:remaining]
+        yield from batch
+        remaining -= len(batch)
+        if remaining <= 0:
+            break
 
-        items.extend(batch)
 
-        # Respect count limit
-        if len(items) >= count:
-            items = items[:count]
-            break
+def _preallocate(fd, size):
+    """Reserve disk space for a file of the given size
+
+    posix_fallocate allocates the blocks up front, so parallel writes land
+    in one contiguous extent instead of growing a sparse file piecemeal.
+    Where it is unavailable or unsupported by the filesystem, the file is
+    just extended with ftruncate.
+
+    Args:
+        fd: Open file descriptor
+        size: File size in bytes
+    """
+    if size and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass
+    os.ftruncate(fd, size)
+
 
-        url = result.get('@odata.nextLink')
+def _download_ranges(download_url, dest, size):
+    """Download a file as parallel byte ranges written straight to their offsets
 
-    return items[:count]
+    Args:
+        download_url: Pre-authenticated @microsoft.graph.downloadUrl
+        dest: Local destination Path
+        size: File size in bytes
+    """
+    def fetch_range(fd, start):
+        end = min(start + DOWNLOAD_RANGE_SIZE, size) - 1
+        # The download URL is pre-authenticated; no Authorization header
+        req = urllib.request.Request(download_url, headers={'Range': f'bytes={start}-{end}'})
 
+        # One reusable buffer per range instead of a new bytes object per read
+        buffer = bytearray(COPY_BUFFER_SIZE)
+        view = memoryview(buffer)
 
-def download_file(access_token, item_id, dest_path, drive_id=None):
+        with urllib.request.urlopen(req) as response:
+            if response.status != 206:
+                raise IOError(f"server ignored range request (status {response.status})")
+            offset = start
+            while True:
+                n = response.readinto(buffer)
+                if not n:
+                    break
+                os.pwrite(fd, view[:n], offset)
+                offset += n
+
+        if offset != end + 1:
+            raise IOError(f"short read for bytes {start}-{end}")
+
+    fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        _preallocate(fd, size)
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            futures = [executor.submit(fetch_range, fd, start)
+                       for start in range(0, size, DOWNLOAD_RANGE_SIZE)]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+
+def quick_xor_hash(path):
+    """Compute the OneDrive quickXorHash of a local file
+
+    The hash XORs byte i into a 160-bit value rotated left by (i * 11) % 160
+    bits, then XORs the file length into the last 8 bytes. The rotation only
+    depends on i % 160, so the file is first XOR-folded into 160 bytes with
+    big-int operations and the rotations are applied once per position.
+
+    Args:
+        path: Local file path
+
+    Returns:
+        Base64-encoded hash string, as in item['file']['hashes']['quickXorHash']
+    """
+    blocks = 4096  # 160-byte blocks per read; must be a power of two
+    chunk_size = _QXH_FOLD * blocks
+    folded = 0
+    length = 0
+
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            length += len(chunk)
+
+            # Zero padding doesn't change the XOR; fold halves down to 160 bytes
+            value = int.from_bytes(chunk.ljust(chunk_size, b'\0'), 'little')
+            bits = chunk_size * 8
+            while bits > _QXH_FOLD * 8:
+                bits //= 2
+                value = (value >> bits) ^ (value & ((1 << bits) - 1))
+            folded ^= value
+
+    result = 0
+    for position, byte in enumerate(folded.to_bytes(_QXH_FOLD, 'little')):
+        if byte:
+            rotated = byte << ((position * 11) % _QXH_BITS)
+            result ^= (rotated & _QXH_MASK) | (rotated >> _QXH_BITS)
+
+    result ^= (length & 0xFFFFFFFFFFFFFFFF) << 96
+    return base64.b64encode(result.to_bytes(_QXH_BITS // 8, 'little')).decode()
+
+
+def _is_unchanged(item, dest):
+    """Check whether a local file already matches a remote item's content"""
+    hashes = item.get('file', {}).get('hashes', {})
+    remote_hash = hashes.get('quickXorHash')
+    if not remote_hash or not dest.is_file() or dest.stat().st_size != item.get('size'):
+        return False
+    return quick_xor_hash(dest) == remote_hash
+
+
+def download_file(access_token, item_id, dest_path, drive_id=None, item=None, skip_unchanged=False):
     """Download a file from OneDrive/SharePoint
 
+    The response body is streamed to disk. If the item metadata is passed in
+    and the file is at least DOWNLOAD_RANGE_THRESHOLD bytes, it is fetched as
+    parallel byte ranges from its pre-authenticated download URL instead.
+
     Args:
         access_token: OAuth2 access token
         item_id: File item ID
         dest_path: Local destination path
         drive_id: Drive ID (default: personal OneDrive)
+        item: Optional item object (provides size, hashes and download URL)
+        skip_unchanged: Don't download if dest_path already has the same
+                        content (compared by quickXorHash; needs item)
 
     Returns:
-        True on success, False on error
+        True on success (or skipped), False on error
     """
-    # Get personal drive if not specified
-    if not drive_id:
-        personal_drive = make_graph_request('/me/drive', access_token)
-        if not personal_drive:
-            return False
-        drive_id = personal_drive['id']
-
-    # Get download URL
-    url = f"{GRAPH_API_BASE}/drives/{drive_id}/items/{item_id}/content"
-
-    headers = {
-        'Authorization': f'Bearer {access_token}'
-    }
+    dest = Path(dest_path)
+    size = item.get('size', 0) if item else 0
+    download_url = item.get('@microsoft.graph.downloadUrl') if item else None
 
     try:
-        req = urllib.request.Request(url, headers=headers)
+        if skip_unchanged and item and _is_unchanged(item, dest):
+            return True
 
-        with urllib.request.urlopen(req) as response:
-            # Ensure destination directory exists
-            dest = Path(dest_path)
-            dest.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure destination directory exists
+        dest.parent.mkdir(parents=True, exist_ok=True)
 
-            # Download file
-            with open(dest, 'wb') as f:
-                f.write(response.read())
+        # Write to a temporary file next to dest and rename it into place,
+        # so an interrupted download never leaves a truncated file behind
+        partial = dest.with_name(f".{dest.name}.{os.getpid()}.part")
+
+        try:
+            if download_url and size >= DOWNLOAD_RANGE_THRESHOLD and hasattr(os, 'pwrite'):
+                _download_ranges(download_url, partial, size)
+            else:
+                # Stream to disk without holding the whole file in memory,
+                # over this thread's keep-alive connection so concurrent
+                # downloads each reuse one TLS session
+                with open(partial, 'wb') as f:
+                    if size:
+                        _preallocate(f.fileno(), size)
+
+                    if download_url:
+                        # Pre-authenticated; no Authorization header
+                        status, _, body = pooled_request('GET', download_url, sink=f)
+                    else:
+                        url = f"{GRAPH_API_BASE}{_drive_path(drive_id)}/items/{item_id}/content"
+                        status, headers, body = pooled_request('GET', url, {
+                            'Authorization': f'Bearer {access_token}'
+                        }, sink=f)
+                        # The content endpoint redirects to the download URL
+                        if status in _REDIRECT_STATUSES:
+                            status, _, body = pooled_request('GET', headers['Location'], sink=f)
+
+                    if status != 200:
+                        raise IOError(f"{status} - {body.decode(errors='replace')}")
+
+                    # Drop any reserved space the body didn't fill
+                    f.truncate()
+
+            os.replace(partial, dest)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
 
         return True
 
@@ -263,9 +822,156 @@ def download_file(access_token, item_id, dest_path, drive_id=None):
         return False
 
 
+def download_files(access_token, items, dest_dir, drive_id=None, max_workers=16, skip_unchanged=True):
+    """Download several files concurrently
+
+    Args:
+        access_token: OAuth2 access token
+        items: Iterable of file item objects
+        dest_dir: Local destination directory
+        drive_id: Drive ID (default: personal OneDrive)
+        max_workers: Maximum number of simultaneous downloads
+        skip_unchanged: Don't re-download files whose local copy matches
+
+    Yields:
+        (item, success) tuples in completion order
+    """
+    dest_dir = Path(dest_dir)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_file, access_token, item['id'], dest_dir / item['name'],
+                            drive_id, item=item, skip_unchanged=skip_unchanged): item
+            for item in items
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _download_tree(access_token, folder_path, dest_dir, drive_id=None):
+    """Walk a remote folder and pair every file with its local destination
+
+    Args:
+        access_token: OAuth2 access token
+        folder_path: Remote folder path
+        dest_dir: Local directory mirroring the remote folder
+        drive_id: Drive ID (default: personal OneDrive)
+
+    Yields:
+        (item, local Path) tuples for every file under the folder
+    """
+    root = folder_path.strip('/')
+
+    for path, children in _walk_folders(access_token, folder_path, drive_id):
+        relative = path.strip('/')[len(root):].strip('/')
+        local_dir = dest_dir / relative if relative else dest_dir
+        for child in children:
+            if child['_type'] == 'file':
+                yield child, local_dir / child['name']
+
+
+def _upload_session_offset(upload_url):
+    """Ask an upload session which byte offset it expects next
+
+    Args:
+        upload_url: Pre-authenticated upload session URL
+
+    Returns:
+        Next expected offset, or None if the session status is unavailable
+    """
+    try:
+        status, _, body = pooled_request('GET', upload_url)
+    except (OSError, http.client.HTTPException):
+        return None
+
+    if status != 200:
+        return None
+
+    ranges = _json_loads(body).get('nextExpectedRanges')
+    if not ranges:
+        return None
+    return int(ranges[0].split('-')[0])
+
+
+def _upload_session(access_token, source, item_path, file_size, overwrite=False):
+    """Upload a large file through a Graph resumable upload session
+
+    Fragments are read from disk one at a time and PUT in order, since
+    Graph requires a session's byte ranges to arrive sequentially. A
+    fragment that fails with a connection error, 416 or 5xx is retried with
+    exponential backoff, resuming from the offset the session reports.
+
+    Args:
+        access_token: OAuth2 access token
+        source: Local file Path
+        item_path: Graph path of the destination item (relative to GRAPH_API_BASE)
+        file_size: Size of the local file in bytes
+        overwrite: Replace an existing file instead of failing
+
+    Returns:
+        Uploaded item object or None on error
+    """
+    session = make_graph_request(f"{item_path}:/createUploadSession", access_token, method='POST', data={
+        'item': {'@microsoft.graph.conflictBehavior': 'replace' if overwrite else 'fail'}
+    })
+    if not session or 'uploadUrl' not in session:
+        return None
+
+    upload_url = session['uploadUrl']
+
+    try:
+        with open(source, 'rb') as f:
+            offset = 0
+            attempt = 0
+            while offset < file_size:
+                f.seek(offset)
+                chunk = f.read(UPLOAD_CHUNK_SIZE)
+                end = offset + len(chunk) - 1
+
+                # The upload URL is pre-authenticated; no Authorization header
+                try:
+                    status, _, body = pooled_request('PUT', upload_url, {
+                        'Content-Length': str(len(chunk)),
+                        'Content-Range': f'bytes {offset}-{end}/{file_size}'
+                    }, chunk)
+                except (OSError, http.client.HTTPException) as e:
+                    status, body = None, str(e).encode()
+
+                if status is not None and status < 400:
+                    offset = end + 1
+                    attempt = 0
+                    continue
+
+                if (status is None or status == 416 or status >= 500) and attempt < UPLOAD_RETRIES:
+                    time.sleep(UPLOAD_RETRY_DELAY * 2 ** attempt)
+                    attempt += 1
+                    # Pick up wherever the session actually got to
+                    resume = _upload_session_offset(upload_url)
+                    if resume is not None:
+                        offset = resume
+                    continue
+
+                print(f"Error uploading file: {status} - {body.decode(errors='replace')}", file=sys.stderr)
+                return None
+
+        # The final fragment returns the created item (200/201)
+        if status in (200, 201):
+            return _json_loads(body)
+
+        print(f"Error uploading file: upload session ended with status {status}", file=sys.stderr)
+        return None
+
+    except Exception as e:
+        print(f"Error uploading file: {e}", file=sys.stderr)
+        return None
+
+
 def upload_file(access_token, source_path, dest_path, drive_id=None, overwrite=False):
     """Upload a file to OneDrive/SharePoint
 
+    Files smaller than SIMPLE_UPLOAD_LIMIT are sent in a single PUT; larger
+    files go through a resumable upload session in UPLOAD_CHUNK_SIZE pieces.
+
     Args:
         access_token: OAuth2 access token
         source_path: Local file path
@@ -276,13 +982,6 @@ def upload_file(access_token, source_path, dest_path, drive_id=None, overwrite=F
     Returns:
         Uploaded item object or None on error
     """
-    # Get personal drive if not specified
-    if not drive_id:
-        personal_drive = make_graph_request('/me/drive', access_token)
-        if not personal_drive:
-            return None
-        drive_id = personal_drive['id']
-
     source = Path(source_path)
     if not source.exists():
         print(f"Error: File not found: {source_path}", file=sys.stderr)
@@ -291,38 +990,41 @@ def upload_file(access_token, source_path, dest_path, drive_id=None, overwrite=F
     # Get file size
     file_size = source.stat().st_size
 
-    # For small files (<4MB), use simple upload
-    if file_size < 4 * 1024 * 1024:
-        # Remove leading/trailing slashes from dest_path
-        dest_path = dest_path.strip('/')
-        filename = source.name
+    # Remove leading/trailing slashes from dest_path
+    dest_path = dest_path.strip('/')
+    filename = source.name
 
-        if dest_path:
-            url = f"{GRAPH_API_BASE}/drives/{drive_id}/root:/{dest_path}/{filename}:/content"
-        else:
-            url = f"{GRAPH_API_BASE}/drives/{drive_id}/root:/{filename}:/content"
+    if dest_path:
+        item_path = f"{_drive_path(drive_id)}/root:/{_quote_path(dest_path)}/{_quote_path(filename)}"
+    else:
+        item_path = f"{_drive_path(drive_id)}/root:/{_quote_path(filename)}"
 
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/octet-stream'
-        }
+    # For large files (>=4MB), use upload session
+    if file_size >= SIMPLE_UPLOAD_LIMIT:
+        return _upload_session(access_token, source, item_path, file_size, overwrite)
 
-        try:
-            with open(source, 'rb') as f:
-                data = f.read()
+    # For small files (<4MB), use simple upload
+    url = f"{GRAPH_API_BASE}{item_path}:/content"
 
-            req = urllib.request.Request(url, data=data, headers=headers, method='PUT')
+    headers = {
+        'Authorization': f'Bearer {access_token}',
+        'Content-Type': 'application/octet-stream',
+        'Content-Length': str(file_size)
+    }
 
-            with urllib.request.urlopen(req) as response:
-                return eval(response.read().decode())
+    try:
+        # Stream the body from the open file rather than reading it into memory
+        with open(source, 'rb') as f:
+            status, _, body = pooled_request('PUT', url, headers, f)
 
-        except Exception as e:
-            print(f"Error uploading file: {e}", file=sys.stderr)
+        if status >= 400:
+            print(f"Error uploading file: {status} - {body.decode(errors='replace')}", file=sys.stderr)
             return None
-    else:
-        # For large files (>=4MB), use upload session
-        print("Note: Large file uploads (>=4MB) use resumable upload sessions", file=sys.stderr)
-        print("This feature is not yet implemented. File must be <4MB.", file=sys.stderr)
+
+        return _json_loads(body)
+
+    except Exception as e:
+        print(f"Error uploading file: {e}", file=sys.stderr)
         return None
 
 
@@ -365,6 +1067,29 @@ def get_drives_structured(access_token):
     return structured_drives
 
 
+def _item_to_structured(item):
+    """Convert a Graph driveItem into the structured file/folder schema"""
+    get = item.get
+    size = get('size') or 0
+
+    parent_path = (get('parentReference') or _EMPTY).get('path') or ''
+    if parent_path.startswith(_DRIVE_ROOT_PREFIX):
+        parent_path = parent_path[len(_DRIVE_ROOT_PREFIX):]
+    parent_path = parent_path or '/'
+
+    return {
+        'id': get('id', ''),
+        'name': get('name', ''),
+        'type': get('_type') or ('folder' if 'folder' in item else 'file'),
+        'size': size,
+        'size_formatted': format_size(size) if size else '-',
+        'modified_datetime': get('lastModifiedDateTime', ''),
+        'web_url': get('webUrl', ''),
+        'download_url': get('@microsoft.graph.downloadUrl', ''),
+        'parent_path': parent_path
+    }
+
+
 def list_files_structured(access_token, path='/', drive_id=None, recursive=False, since=None):
     """
     List files and folders as structured data (for MCP/programmatic use).
@@ -391,29 +1116,7 @@ def list_files_structured(access_token, path='/', drive_id=None, recursive=False
             }
     """
     items = list_files(access_token, path, drive_id, recursive, since)
-
-    structured_items = []
-    for item in items:
-        item_type = 'folder' if 'folder' in item else 'file'
-        size = item.get('size', 0) if 'size' in item else 0
-        modified = item.get('lastModifiedDateTime', '')
-
-        parent_ref = item.get('parentReference', {})
-        parent_path = parent_ref.get('path', '').replace('/drive/root:', '') or '/'
-
-        structured_items.append({
-            'id': item.get('id', ''),
-            'name': item.get('name', ''),
-            'type': item_type,
-            'size': size,
-            'size_formatted': format_size(size) if size else '-',
-            'modified_datetime': modified,
-            'web_url': item.get('webUrl', ''),
-            'download_url': item.get('@microsoft.graph.downloadUrl', ''),
-            'parent_path': parent_path
-        })
-
-    return structured_items
+    return [_item_to_structured(item) for item in items]
 
 
 def search_files_structured(access_token, query, drive_id=None, file_type=None, since=None, count=50):
@@ -443,30 +1146,7 @@ def search_files_structured(access_token, query, drive_id=None, file_type=None,
             }
     """
     items = search_files(access_token, query, drive_id, file_type, since, count)
-
-    # Reuse list_files_structured transformation logic
-    structured_items = []
-    for item in items:
-        item_type = 'folder' if 'folder' in item else 'file'
-        size = item.get('size', 0) if 'size' in item else 0
-        modified = item.get('lastModifiedDateTime', '')
-
-        parent_ref = item.get('parentReference', {})
-        parent_path = parent_ref.get('path', '').replace('/drive/root:', '') or '/'
-
-        structured_items.append({
-            'id': item.get('id', ''),
-            'name': item.get('name', ''),
-            'type': item_type,
-            'size': size,
-            'size_formatted': format_size(size) if size else '-',
-            'modified_datetime': modified,
-            'web_url': item.get('webUrl', ''),
-            'download_url': item.get('@microsoft.graph.downloadUrl', ''),
-            'parent_path': parent_path
-        })
-
-    return structured_items
+    return [_item_to_structured(item) for item in items]
 
 
 def download_file_structured(access_token, item_id, dest_path, drive_id=None):
@@ -593,7 +1273,7 @@ def cmd_drives(args):
     """Handle 'o365 files drives' command"""
     access_token = get_access_token()
 
-    drives = get_drives(access_token)
+    drives = get_drives_cached(access_token, args.refresh_drives)
 
     if not drives:
         print("No drives found")
@@ -601,16 +1281,19 @@ def cmd_drives(args):
 
     print(f"\n📁 Available Drives ({len(drives)}):\n")
 
+    rows = []
+
     if args.verbose:
-        print(f"{'Name':<40} {'Type':<20} {'ID':<40}")
-        print("=" * 100)
+        rows.append(f"{'Name':<40} {'Type':<20} {'ID':<40}")
+        rows.append("=" * 100)
 
         for drive in drives:
-            name = drive.get('name', 'Unknown')[:38]
-            drive_type = drive.get('driveType', 'unknown')[:18]
+            name = drive.get('name', 'Unknown')
+            drive_type = drive.get('driveType', 'unknown')
             drive_id = drive['id']
 
-            print(f"{name:<40} {drive_type:<20} {drive_id:<40}")
+            # '<40.38' pads and truncates in one format operation
+            rows.append(f"{name:<40.38} {drive_type:<20.18} {drive_id:<40}")
     else:
         for drive in drives:
             name = drive.get('name', 'Unknown')
@@ -618,10 +1301,11 @@ def cmd_drives(args):
             owner = drive.get('owner', {}).get('user', {}).get('displayName', '')
 
             if owner:
-                print(f"  • {name} ({drive_type}) - owned by {owner}")
+                rows.append(f"  • {name} ({drive_type}) - owned by {owner}")
             else:
-                print(f"  • {name} ({drive_type})")
+                rows.append(f"  • {name} ({drive_type})")
 
+    _flush_rows(rows)
     print(f"\nUse 'o365 files list --drive \"Drive Name\"' to browse a drive")
 
 
@@ -649,31 +1333,39 @@ def cmd_list(args):
 
     # List files
     path = args.path or '/'
-    items = list_files(access_token, path, drive_id, args.recursive, since)
+    items = iter_files(access_token, path, drive_id, args.recursive, since, select=LIST_SELECT)
 
-    if not items:
+    # Peek at the first item so an empty folder still reports as such
+    first = next(items, None)
+    if first is None:
         print(f"No files found in {path}")
         return
 
-    print(f"\n📁 Files in {path} ({len(items)} items):\n")
-
-    if args.long:
-        print(f"{'Type':<8} {'Size':<12} {'Modified':<20} {'Name':<40}")
-        print("=" * 80)
+    print(f"\n📁 Files in {path}:\n")
 
-        for item in items:
-            item_type = 'folder' if 'folder' in item else 'file'
-            size = format_size(item.get('size', 0)) if 'size' in item else '-'
-            modified = parse_graph_datetime(item['lastModifiedDateTime']).strftime('%Y-%m-%d %H:%M') if 'lastModifiedDateTime' in item else '-'
-            name = item['name'][:38]
+    items = chain((first,), items)
+    count = 0
+    rows = []
 
-            print(f"{item_type:<8} {size:<12} {modified:<20} {name:<40}")
+    if args.long:
+        rows.append(f"{'Type':<8} {'Size':<12} {'Modified':<20} {'Name':<40}")
+        rows.append("=" * 80)
+
+        append, fmt = rows.append, _format_file_row
+        for count, item in enumerate(items, 1):
+            append(fmt(item))
+            if len(rows) >= OUTPUT_BLOCK_ROWS:
+                _flush_rows(rows)
     else:
-        for item in items:
-            item_type = '📁' if 'folder' in item else '📄'
+        for count, item in enumerate(items, 1):
+            item_type = '📁' if item['_type'] == 'folder' else '📄'
             name = item['name']
-            print(f"  {item_type} {name}")
+            rows.append(f"  {item_type} {name}")
+            if len(rows) >= OUTPUT_BLOCK_ROWS:
+                _flush_rows(rows)
 
+    _flush_rows(rows)
+    print(f"\n{count} items")
     print(f"\nUse 'o365 files download <path>' to download files")
 
 
@@ -700,68 +1392,54 @@ def cmd_search(args):
             sys.exit(1)
 
     # Search files
-    items = search_files(access_token, args.query, drive_id, args.type, since, args.count or 50)
+    items = iter_search_files(access_token, args.query, drive_id, args.type, since, args.count or 50,
+                              select=SEARCH_SELECT)
 
-    if not items:
+    first = next(items, None)
+    if first is None:
         print(f"No files found matching '{args.query}'")
         return
 
-    print(f"\n🔍 Search results for '{args.query}' ({len(items)} found):\n")
-    print(f"{'Type':<8} {'Size':<12} {'Modified':<20} {'Name':<40} {'Path':<40}")
-    print("=" * 120)
-
-    for item in items:
-        item_type = 'folder' if 'folder' in item else 'file'
-        size = format_size(item.get('size', 0)) if 'size' in item else '-'
-        modified = parse_graph_datetime(item['lastModifiedDateTime']).strftime('%Y-%m-%d %H:%M') if 'lastModifiedDateTime' in item else '-'
-        name = item['name'][:38]
+    print(f"\n🔍 Search results for '{args.query}':\n")
 
-        # Get parent path
-        parent_ref = item.get('parentReference', {})
-        path = parent_ref.get('path', '').replace('/drive/root:', '') or '/'
-        path = path[:38]
+    rows = [f"{'Type':<8} {'Size':<12} {'Modified':<20} {'Name':<40} {'Path':<40}", "=" * 120]
+    count = 0
+    append, fmt = rows.append, _format_search_row
+    for count, item in enumerate(chain((first,), items), 1):
+        append(fmt(item))
+        if len(rows) >= OUTPUT_BLOCK_ROWS:
+            _flush_rows(rows)
 
-        print(f"{item_type:<8} {size:<12} {modified:<20} {name:<40} {path:<40}")
+    _flush_rows(rows)
+    print(f"\n{count} found")
 
 
 def cmd_download(args):
     """Handle 'o365 files download' command"""
     access_token = get_access_token()
 
-    # Resolve drive if specified
-    drive_id = None
-    if args.drive:
+    source_path = args.source.strip('/')
+
+    # Drive IDs and the personal drive (/me/drive) can be addressed directly;
+    # only drive names need the drive list
+    drive_id = args.drive
+    if args.drive and not _looks_like_drive_id(args.drive):
         drive = resolve_drive(args.drive, access_token)
         if not drive:
             print(f"Error: Drive not found: {args.drive}", file=sys.stderr)
             sys.exit(1)
         drive_id = drive['id']
-    else:
-        # Get personal drive
-        personal_drive = make_graph_request('/me/drive', access_token)
-        if not personal_drive:
-            print("Error: Could not access personal drive", file=sys.stderr)
-            sys.exit(1)
-        drive_id = personal_drive['id']
 
-    # Get file item by path
-    source_path = args.source.strip('/')
-    encoded_path = urllib.parse.quote(source_path)
-    url = f"{GRAPH_API_BASE}/drives/{drive_id}/root:/{encoded_path}"
+    item = make_graph_request(
+        f"{_drive_path(drive_id)}/root:/{_quote_path(source_path)}?$select={_ITEM_SELECT}", access_token)
 
-    item = make_graph_request(url, access_token)
     if not item:
         print(f"Error: File not found: {args.source}", file=sys.stderr)
         sys.exit(1)
 
-    # Check if it's a folder
-    if 'folder' in item:
-        if not args.recursive:
-            print(f"Error: '{args.source}' is a folder. Use --recursive to download folders.", file=sys.stderr)
-            sys.exit(1)
-        else:
-            print("Error: Recursive folder downloads not yet implemented", file=sys.stderr)
-            sys.exit(1)
+    # The item says which drive it is in, so the personal drive's ID never
+    # needs a request of its own
+    drive_id = (item.get('parentReference') or _EMPTY).get('driveId', drive_id)
 
     # Determine destination
     if args.dest:
@@ -771,6 +1449,14 @@ def cmd_download(args):
     else:
         dest = Path.cwd() / item['name']
 
+    # Check if it's a folder
+    if 'folder' in item:
+        if not args.recursive:
+            print(f"Error: '{args.source}' is a folder. Use --recursive to download folders.", file=sys.stderr)
+            sys.exit(1)
+        _download_folder(access_token, source_path, dest, drive_id, args.overwrite, args.parallel)
+        return
+
     # Check if file exists
     if dest.exists() and not args.overwrite:
         print(f"Error: File exists: {dest}", file=sys.stderr)
@@ -780,13 +1466,57 @@ def cmd_download(args):
     # Download file
     print(f"Downloading {item['name']} ({format_size(item.get('size', 0))})...")
 
-    if download_file(access_token, item['id'], dest, drive_id):
+    # An existing identical file (--overwrite) is left alone
+    if download_file(access_token, item['id'], dest, drive_id, item=item, skip_unchanged=True):
         print(f"✓ Downloaded to {dest}")
     else:
         print("Error: Download failed", file=sys.stderr)
         sys.exit(1)
 
 
+def _download_folder(access_token, folder_path, dest_dir, drive_id, overwrite, parallel):
+    """Download a remote folder tree, several files at a time
+
+    Downloads start while the tree is still being listed. Exits with an
+    error status if any file fails.
+
+    Args:
+        access_token: OAuth2 access token
+        folder_path: Remote folder path
+        dest_dir: Local destination directory
+        drive_id: Drive ID
+        overwrite: Overwrite existing local files
+        parallel: Number of simultaneous downloads
+    """
+    print(f"Downloading {folder_path or '/'} to {dest_dir}...")
+
+    downloaded = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+        futures = {}
+        for child, local_path in _download_tree(access_token, folder_path, dest_dir, drive_id):
+            if local_path.exists() and not overwrite:
+                print(f"Skipping existing file: {local_path}", file=sys.stderr)
+                continue
+            future = executor.submit(download_file, access_token, child['id'], local_path,
+                                     drive_id, item=child, skip_unchanged=True)
+            futures[future] = local_path
+
+        for future in as_completed(futures):
+            if future.result():
+                downloaded += 1
+                print(f"✓ {futures[future]}")
+            else:
+                failed += 1
+                print(f"✗ {futures[future]}", file=sys.stderr)
+
+    print(f"\nDownloaded {downloaded} file(s) to {dest_dir}")
+    if failed:
+        print(f"Error: {failed} file(s) failed to download", file=sys.stderr)
+        sys.exit(1)
+
+
 def cmd_upload(args):
     """Handle 'o365 files upload' command"""
     access_token = get_access_token()
@@ -827,11 +1557,43 @@ def cmd_upload(args):
 
 def format_size(bytes_size):
     """Format byte size to human-readable string"""
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_size < 1024.0:
-            return f"{bytes_size:.1f}{unit}"
-        bytes_size /= 1024.0
-    return f"{bytes_size:.1f}PB"
+    # The unit is picked from the bit length: every 10 bits is another 1024x
+    exponent = min((int(bytes_size).bit_length() - 1) // 10, 5) if bytes_size >= 1024 else 0
+    return f"{bytes_size / (1 << (10 * exponent)):.1f}{_SIZE_UNITS[exponent]}"
+
+
+def _flush_rows(rows):
+    """Write buffered output rows to stdout in a single call
+
+    Args:
+        rows: List of output lines; emptied after writing
+    """
+    if rows:
+        sys.stdout.write('\n'.join(rows) + '\n')
+        sys.stdout.flush()
+        rows.clear()
+
+
+def _format_file_row(item, _format_size=format_size, _parse=parse_graph_datetime):
+    """Format an item as a 'files list --long' / 'files search' table row
+
+    Args:
+        item: File or folder dict as returned by the listing helpers
+
+    Returns:
+        Row string with type, size, modified and (truncated) name columns
+    """
+    size = item.get('size')
+    modified = item.get('lastModifiedDateTime')
+    size = _format_size(size) if size is not None else '-'
+    modified = _parse(modified).isoformat(' ', 'minutes')[:16] if modified else '-'
+    return f"{item['_type']:<8} {size:<12} {modified:<20} {item['name']:<40.38}"
+
+
+def _format_search_row(item, _format_row=_format_file_row):
+    """Format a search result as a table row with its parent path column"""
+    path = (item.get('parentReference') or _EMPTY).get('path', '').removeprefix(_DRIVE_ROOT_PREFIX) or '/'
+    return f"{_format_row(item)} {path:<40.38}"
 
 
 # Setup and routing
@@ -848,6 +1610,8 @@ def setup_parser(subparsers):
 
     drives_parser.add_argument('-v', '--verbose', action='store_true',
                               help='Show drive IDs and details')
+    drives_parser.add_argument('--refresh-drives', action='store_true',
+                              help='Ignore the cached drive list and fetch it again')
 
     drives_parser.set_defaults(func=cmd_drives)
 
@@ -903,6 +1667,8 @@ def setup_parser(subparsers):
                                 help='Source drive name or ID')
     download_parser.add_argument('-r', '--recursive', action='store_true',
                                 help='Download folder recursively')
+    download_parser.add_argument('--parallel', type=int, default=8, metavar='N',
+                                help='Simultaneous downloads for --recursive (default: 8)')
     download_parser.add_argument('--overwrite', action='store_true',
                                 help='Overwrite existing files')
 
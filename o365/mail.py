@@ -5,16 +5,46 @@ Sync, read, archive, mark read, and send emails.
 """
 
 import sys
-import subprocess
+import os
+import time
 import re
-import html2text
+import hashlib
 import argparse
+from urllib.parse import quote
+from collections import deque
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
-from .common import get_access_token, make_graph_request, GRAPH_API_BASE
+from .common import (
+    get_access_token, make_graph_request, graph_batch, iter_graph_pages,
+    read_cache, write_cache, clear_cache, prune_cache, submit_prefetch, retry_delay, pooled_request,
+    GRAPH_API_BASE, BATCH_THROTTLE_RETRIES, CACHE_MESSAGES
+)
 from .calendar import parse_since_expression
 
+# Graph timestamps are parsed with ciso8601 when it is installed
+try:
+    from ciso8601 import parse_datetime as _parse_iso_datetime
+except ImportError:
+    _parse_iso_datetime = None
+
+# HTML bodies are reduced to plain text with selectolax when it is installed.
+# It (and html2text) are only imported when a body is rendered: False until
+# then, None if selectolax is missing (see _get_html_parser)
+_HTMLParser = False
+
+# Fractional seconds beyond microseconds (Graph sends up to 7 digits)
+_FRAC_RE = re.compile(r'\.(\d{6})\d*')
+
+# Without selectolax, HTML bodies are reduced to text with these patterns:
+# invisible elements and comments are dropped, block-level boundaries become
+# line breaks, and all other tags are removed
+_HTML_HIDDEN_RE = re.compile(r'<(script|style|head|title)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.I | re.S)
+_HTML_BREAK_RE = re.compile(r'<(?:br|/?p|/div|/tr|/li|/h[1-6]|/table|/blockquote)\b[^>]*>', re.I)
+_HTML_TAG_RE = re.compile(r'<[^>]*>')
+
 # For now, some commands are implemented by calling existing scripts
 # Later we can refactor these into pure Python if needed
 
@@ -24,21 +54,64 @@ MAILDIR_BASE = Path.home() / ".mail" / "office365"
 # Get local timezone
 LOCAL_TZ = datetime.now().astimezone().tzinfo
 
+# LOCAL_TZ is a fixed offset, so converting a UTC time to local time is just
+# adding it; when it is zero, Graph's UTC timestamps can be shown as-is
+_LOCAL_OFFSET = LOCAL_TZ.utcoffset(None)
+_LOCAL_IS_UTC = not _LOCAL_OFFSET
+
 # Cache for user's email domain
 _USER_DOMAIN = None
 
+# The user's domain practically never changes, so it is kept on disk too
+USER_DOMAIN_CACHE_NAME = 'user_domain'
+USER_DOMAIN_CACHE_TTL = 30 * 24 * 60 * 60
+
+# With "[cache] messages = true", messages read by ID are kept on disk and
+# shown from there on later reads; expired files are pruned on each write
+MESSAGE_CACHE_DIR_NAME = 'messages'
+MESSAGE_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Mail folder IDs are stable, so the folder name -> ID map is kept on disk
+MAIL_FOLDERS_CACHE_NAME = 'mail_folders'
+MAIL_FOLDERS_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Message pages requested concurrently when the number of messages is known
+MESSAGE_PAGE_PREFETCH = 4
+
+# Message fields requested for listings; bodies are left out since they are
+# by far the largest part of each message and no list view shows them
+MESSAGE_LIST_SELECT = ('id', 'subject', 'from', 'receivedDateTime', 'isRead', 'bodyPreview', 'hasAttachments')
+
+# Attachment metadata expanded into listings and single-message views;
+# selecting fields keeps each attachment's base64 contentBytes out of the
+# response. contentId only exists on file attachments, so it is selected
+# through a type cast (inline images are shown as [cid:...])
+_ATTACHMENTS_EXPAND_PARAM = '$expand=' + quote(
+    'attachments($select=id,name,contentType,size,isInline,microsoft.graph.fileAttachment/contentId)',
+    safe=',/'
+)
+
+# Units for format_size, one per power of 1024
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Asks Graph to convert HTML bodies to plain text server-side
+_TEXT_BODY_HEADERS = {'Prefer': 'outlook.body-content-type="text"'}
+
 
 def get_user_domain(access_token):
-    """Get the logged-in user's email domain"""
+    """Get the logged-in user's email domain, using the on-disk cache when fresh"""
     global _USER_DOMAIN
     if _USER_DOMAIN is None:
-        user = make_graph_request('/me', access_token)
+        _USER_DOMAIN = read_cache(USER_DOMAIN_CACHE_NAME, USER_DOMAIN_CACHE_TTL)
+    if _USER_DOMAIN is None:
+        user = make_graph_request('/me?$select=mail,userPrincipalName', access_token)
         if user:
             email = user.get('mail') or user.get('userPrincipalName', '')
             if '@' in email:
-                _USER_DOMAIN = email.split('@')[1].lower()
+                _USER_DOMAIN = email.rpartition('@')[2].lower()
             else:
                 _USER_DOMAIN = ''
+            write_cache(USER_DOMAIN_CACHE_NAME, _USER_DOMAIN)
         else:
             _USER_DOMAIN = ''
     return _USER_DOMAIN
@@ -52,22 +125,81 @@ def is_external_sender(sender_email, user_domain):
     if '@' not in sender_email:
         return False
 
-    sender_domain = sender_email.split('@')[1].lower()
-    return sender_domain != user_domain
+    return sender_email.rpartition('@')[2].lower() != user_domain
+
+
+def make_external_check(user_domain):
+    """Build an external-sender check bound to the user's domain
+
+    Args:
+        user_domain: User's email domain, or '' if unknown
+
+    Returns:
+        Function taking a sender address and returning whether it is external
+    """
+    if not user_domain:
+        return lambda sender_email: False
+
+    user_domain = user_domain.lower()
+
+    def is_external(sender_email):
+        return '@' in sender_email and sender_email.rpartition('@')[2].lower() != user_domain
+
+    return is_external
+
+
+def get_mail_folder_ids(access_token, refresh=False):
+    """Get top-level mail folder IDs by name, using the on-disk cache when fresh
+
+    Args:
+        access_token: OAuth2 access token
+        refresh: Ignore the cache and fetch the folder list from Graph
+
+    Returns:
+        Dict of case-folded display name -> folder ID, or None on error
+    """
+    folders = None if refresh else read_cache(MAIL_FOLDERS_CACHE_NAME, MAIL_FOLDERS_CACHE_TTL)
+    if folders is None:
+        pages = list(iter_graph_pages(f"{GRAPH_API_BASE}/me/mailFolders?$select=id,displayName", access_token))
+        if not pages:
+            return None
+
+        folders = {}
+        for page in pages:
+            for folder in page.get('value', []):
+                folders.setdefault(folder.get('displayName', '').casefold(), folder['id'])
+        write_cache(MAIL_FOLDERS_CACHE_NAME, folders)
+    return folders
 
 
+@lru_cache(maxsize=4096)
 def parse_graph_datetime(dt_str):
-    """Parse Microsoft Graph datetime format"""
-    import re
-    # Remove excess fractional seconds (keep max 6 digits)
-    dt_str = re.sub(r'\.(\d{6})\d*', r'.\1', dt_str)
-    # Handle timezone
-    if not dt_str.endswith('Z') and '+' not in dt_str and '-' not in dt_str[-6:]:
-        dt_str += 'Z'
-    return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    """Parse Microsoft Graph datetime format
 
+    Results are memoized; datetimes are immutable, so sharing them is safe.
+    """
+    # ciso8601 handles the 'Z' suffix and 7-digit fractions itself
+    if _parse_iso_datetime is not None:
+        try:
+            dt = _parse_iso_datetime(dt_str)
+        except ValueError:
+            pass
+        else:
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
 
-def get_messages_stream(access_token, folder='Inbox', max_count=None, since=None, unread=None, search=None):
+    # Remove excess fractional seconds (keep max 6 digits)
+    if '.' in dt_str:
+        dt_str = _FRAC_RE.sub(r'.\1', dt_str)
+    # Graph almost always returns UTC with a 'Z' suffix
+    if dt_str[-1] == 'Z':
+        return datetime.fromisoformat(dt_str[:-1] + '+00:00')
+    if '+' not in dt_str and '-' not in dt_str[-6:]:
+        dt_str += '+00:00'
+    return datetime.fromisoformat(dt_str)
+
+
+def get_messages_stream(access_token, folder='Inbox', max_count=None, since=None, unread=None, search=None,
+                        select=None, attachments=True):
     """Get messages from a mail folder, yielding pages as they're fetched
 
     Args:
@@ -77,21 +209,29 @@ def get_messages_stream(access_token, folder='Inbox', max_count=None, since=None
         since: Optional datetime to filter messages after
         unread: Optional filter for unread (True), read (False), or all (None)
         search: Optional search query
+        select: Message fields to request (default: MESSAGE_LIST_SELECT)
+        attachments: Include attachment metadata in each message; without
+                     it, only hasAttachments tells whether there are any
 
     Yields:
         Lists of message objects (one list per page)
     """
+    # Nothing wanted; $top=0 would still cost a request
+    if max_count is not None and max_count <= 0:
+        return
+
     # Build URL
     url = f"{GRAPH_API_BASE}/me/mailFolders/{folder}/messages"
 
     # Build query parameters - use a reasonable page size for streaming
     # Graph API default is 10, but we'll use 50 for better performance
-    page_size = 50
-    params = {
-        '$top': str(page_size),
-        '$select': 'id,subject,from,receivedDateTime,isRead,body,bodyPreview,hasAttachments',
-        '$expand': 'attachments($select=id,name,contentType,size,isInline)'
-    }
+    page_size = 50 if max_count is None else min(max_count, 50)
+    query = [
+        f'$top={page_size}',
+        f'$select={",".join(select or MESSAGE_LIST_SELECT)}'
+    ]
+    if attachments:
+        query.append(_ATTACHMENTS_EXPAND_PARAM)
 
     # Add filters
     filters = []
@@ -103,55 +243,148 @@ def get_messages_stream(access_token, folder='Inbox', max_count=None, since=None
     if search:
         # Use $search for full-text search across subject, body, etc.
         # Note: $orderby is not supported with $search in Graph API
-        params['$search'] = f'"{search}"'
+        query.append('$search=' + quote(f'"{search}"', safe=''))
     else:
         # Only add $orderby when NOT using $search
-        params['$orderby'] = 'receivedDateTime desc'
+        query.append('$orderby=receivedDateTime%20desc')
 
     if filters:
-        params['$filter'] = ' and '.join(filters)
+        query.append('$filter=' + quote(' and '.join(filters), safe=''))
 
-    # Build query string
-    import urllib.parse
-    query_string = urllib.parse.urlencode(params)
-    url = f"{url}?{query_string}"
+    # Build query string (field names need no escaping)
+    url = f"{url}?{'&'.join(query)}"
 
-    # Fetch messages with pagination, yielding each page
+    # With a known count, the pages can be requested by offset, several at
+    # once, instead of waiting for each @odata.nextLink ($skip can't be
+    # combined with $search)
+    if max_count is not None and max_count > page_size and not search:
+        yield from _iter_pages_by_skip(url, access_token, page_size, max_count)
+        return
+
+    # Fetch messages with pagination, yielding each page. The next page is
+    # requested in the background before the current one is handed out, so
+    # it is already in flight while the caller displays this one.
     total_fetched = 0
-    while url:
-        result = make_graph_request(url, access_token)
-        if not result:
-            break
+    future = None
+    result = make_graph_request(url, access_token)
+    try:
+        while result:
+            page_messages = result.get('value', [])
 
-        page_messages = result.get('value', [])
+            # If max_count is set, truncate this page if needed
+            if max_count is not None and len(page_messages) > max_count - total_fetched:
+                page_messages = page_messages[:max_count - total_fetched]
 
-        # If max_count is set, truncate this page if needed
-        if max_count is not None:
-            remaining = max_count - total_fetched
-            if remaining <= 0:
-                break
-            if len(page_messages) > remaining:
-                page_messages = page_messages[:remaining]
+            total_fetched += len(page_messages)
 
-        total_fetched += len(page_messages)
+            # Only prefetch when more messages are wanted
+            next_url = result.get('@odata.nextLink')
+            future = None
+            if next_url and (max_count is None or total_fetched < max_count):
+                future = submit_prefetch(make_graph_request, next_url, access_token)
 
-        # Yield this page of messages
-        if page_messages:
-            yield page_messages
+            # Yield this page of messages
+            if page_messages:
+                yield page_messages
 
-        # Check for pagination
-        url = result.get('@odata.nextLink')
+            result = future.result() if future else None
+    finally:
+        # Drop the prefetch if the caller stopped before it was needed
+        if future:
+            future.cancel()
 
-        # Stop if we've hit the limit
-        if max_count is not None and total_fetched >= max_count:
-            break
 
+def _iter_pages_by_skip(url, access_token, page_size, max_count):
+    """Fetch up to max_count messages as concurrent $skip pages
 
-def display_message_summary(msg, user_domain):
-    """Display a single message in list format"""
-    # Parse date
-    received = parse_graph_datetime(msg['receivedDateTime']).astimezone(LOCAL_TZ)
-    date_str = received.strftime('%Y-%m-%d %H:%M')
+    Up to MESSAGE_PAGE_PREFETCH pages are in flight at once; pages are
+    yielded in order, stopping at the first short or failed page. Pages
+    still queued when iteration stops are cancelled.
+
+    Args:
+        url: Message list URL including $top=page_size
+        access_token: OAuth2 access token
+        page_size: Messages per page
+        max_count: Maximum number of messages
+
+    Yields:
+        Lists of message objects (one list per page)
+    """
+    offsets = iter(range(0, max_count, page_size))
+    pending = deque(submit_prefetch(make_graph_request, f"{url}&$skip={offset}", access_token)
+                    for offset in islice(offsets, MESSAGE_PAGE_PREFETCH))
+
+    total_fetched = 0
+    try:
+        while pending:
+            result = pending.popleft().result()
+            if not result:
+                return
+
+            page_messages = result.get('value', [])
+            if page_messages:
+                yield page_messages[:max_count - total_fetched]
+            total_fetched += len(page_messages)
+
+            if len(page_messages) < page_size or total_fetched >= max_count:
+                return
+
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(submit_prefetch(make_graph_request, f"{url}&$skip={offset}", access_token))
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _to_local(dt_str):
+    """Parse a Graph timestamp and shift it to local time
+
+    UTC timestamps get the precomputed local offset added instead of going
+    through astimezone. The result is only meant for formatting: its tzinfo
+    stays UTC when the offset was added.
+
+    Args:
+        dt_str: ISO 8601 datetime string from Graph
+
+    Returns:
+        datetime whose fields are the local date and time
+    """
+    if dt_str[-1] == 'Z':
+        if _LOCAL_IS_UTC:
+            return parse_graph_datetime(dt_str)
+        return parse_graph_datetime(dt_str) + _LOCAL_OFFSET
+    return parse_graph_datetime(dt_str).astimezone(LOCAL_TZ)
+
+
+def _local_minute_str(dt_str):
+    """Format a Graph timestamp as local 'YYYY-MM-DD HH:MM'
+
+    Args:
+        dt_str: ISO 8601 datetime string from Graph
+
+    Returns:
+        Formatted local date and time
+    """
+    # UTC timestamps need no parsing when local time is UTC too
+    if _LOCAL_IS_UTC and dt_str[-1] == 'Z':
+        return f"{dt_str[:10]} {dt_str[11:16]}"
+    # isoformat is a C-level fast path, unlike strftime's format parsing;
+    # the slice drops the UTC offset it appends
+    return _to_local(dt_str).isoformat(' ', 'minutes')[:16]
+
+
+def format_message_summary(msg, is_external):
+    """Format a single message in list format
+
+    Args:
+        msg: Message object from Graph
+        is_external: Check from make_external_check (for the [external] prefix)
+
+    Returns:
+        Summary lines (sender, subject, ID) followed by a blank line
+    """
+    date_str = _local_minute_str(msg['receivedDateTime'])
 
     # Get sender
     from_field = msg.get('from', {}).get('emailAddress', {})
@@ -162,34 +395,121 @@ def display_message_summary(msg, user_domain):
     subject = msg.get('subject', '(No subject)')
 
     # Add [external] prefix if sender is from outside the organization
-    if is_external_sender(sender_email, user_domain):
+    if is_external(sender_email):
         subject = f"[external] {subject}"
 
     # Mark unread with indicator
     unread_mark = '●' if not msg.get('isRead', True) else ' '
 
-    # Check for real attachments (not inline images)
-    has_real_attachments = False
-    for att in msg.get('attachments', []):
-        if not att.get('isInline', False):
-            has_real_attachments = True
-            break
+    # Check for real attachments (not inline images); hasAttachments already
+    # leaves inline ones out when the attachments weren't expanded
+    if 'attachments' in msg:
+        has_real_attachments = any(not att.get('isInline', False) for att in msg['attachments'])
+    else:
+        has_real_attachments = msg.get('hasAttachments', False)
     attachment_mark = '📎' if has_real_attachments else ''
 
     # Full message ID
     msg_id = msg['id']
 
-    print(f"{unread_mark} [{date_str}] {sender}")
-    print(f"  Subject: {subject} {attachment_mark}")
-    print(f"  ID: {msg_id}")
-    print()
+    return (f"{unread_mark} [{date_str}] {sender}\n"
+            f"  Subject: {subject} {attachment_mark}\n"
+            f"  ID: {msg_id}\n\n")
+
+
+def display_message_summary(msg, is_external):
+    """Display a single message in list format"""
+    sys.stdout.write(format_message_summary(msg, is_external))
+
+
+def _get_html_parser():
+    """Import selectolax's HTMLParser on first use
+
+    Returns:
+        HTMLParser class, or None if selectolax is not installed
+    """
+    global _HTMLParser
+    if _HTMLParser is False:
+        try:
+            from selectolax.parser import HTMLParser as _HTMLParser
+        except ImportError:
+            _HTMLParser = None
+    return _HTMLParser
+
+
+def _strip_html(content):
+    """Reduce HTML to its text with regular expressions
+
+    Args:
+        content: HTML body
+
+    Returns:
+        Plain text with one line per block and no blank lines
+    """
+    from html import unescape
+
+    content = _HTML_HIDDEN_RE.sub('', content)
+    content = _HTML_BREAK_RE.sub('\n', content)
+    text = unescape(_HTML_TAG_RE.sub('', content))
+    return '\n'.join(filter(None, (' '.join(line.split()) for line in text.splitlines())))
 
 
-def display_message(msg, html=False):
+def _html_to_text(content, full_render=False):
+    """Convert an HTML message body to plain text
+
+    Bodies are stripped to their text with selectolax when it is installed,
+    or with regular expressions otherwise; html2text is only used for
+    full_render.
+
+    Args:
+        content: HTML body
+        full_render: Render with html2text (Markdown-style, keeps links)
+
+    Returns:
+        Plain text string
+    """
+    if not full_render:
+        parser = _get_html_parser()
+        if parser is not None:
+            tree = parser(content)
+            tree.strip_tags(['script', 'style', 'img'])
+            root = tree.body or tree.root
+            return root.text(separator='\n', strip=True) if root else ''
+        return _strip_html(content)
+
+    # A fresh converter per body: construction is cheap next to handle(),
+    # and a reused one carries parser state (e.g. an unclosed <style>) over
+    # into the next message
+    import html2text
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.ignore_images = True
+    return h.handle(content)
+
+
+def _write_text(content):
+    """Write text and a newline to stdout in a single write
+
+    The text is encoded once and written to the binary buffer underneath
+    sys.stdout when there is one, rather than going through the text layer.
+
+    Args:
+        content: Text to write (e.g. a full message with its body)
+    """
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        sys.stdout.write(content + '\n')
+        return
+
+    # Earlier print() output is still in the text layer
+    sys.stdout.flush()
+    buffer.write(content.encode(sys.stdout.encoding or 'utf-8', errors='replace') + b'\n')
+
+
+def display_message(msg, html=False, full_render=False):
     """Display a single message with full details"""
     # Parse date
-    received = parse_graph_datetime(msg['receivedDateTime']).astimezone(LOCAL_TZ)
-    date_str = received.strftime('%Y-%m-%d %H:%M:%S')
+    date_str = _to_local(msg['receivedDateTime']).isoformat(' ', 'seconds')[:19]
 
     # Get sender
     from_field = msg.get('from', {}).get('emailAddress', {})
@@ -202,13 +522,15 @@ def display_message(msg, html=False):
     to_list = [r.get('emailAddress', {}).get('address', '') for r in to_addresses]
     to_str = ', '.join(to_list)
 
-    # Print header
-    print("\n" + "=" * 80)
-    print(f"From:    {sender}")
-    print(f"To:      {to_str}")
-    print(f"Date:    {date_str}")
-    print(f"Subject: {msg.get('subject', '(No subject)')}")
-    print(f"ID:      {msg['id']}")
+    # Header lines; the whole message is written at once below
+    lines = [
+        "\n" + "=" * 80,
+        f"From:    {sender}",
+        f"To:      {to_str}",
+        f"Date:    {date_str}",
+        f"Subject: {msg.get('subject', '(No subject)')}",
+        f"ID:      {msg['id']}"
+    ]
 
     # Show attachments if present
     attachments = msg.get('attachments', [])
@@ -225,18 +547,18 @@ def display_message(msg, html=False):
 
         # Show real attachments first
         if real_attachments:
-            print(f"\nAttachments ({len(real_attachments)}):")
+            lines.append(f"\nAttachments ({len(real_attachments)}):")
             for att in real_attachments:
                 name = att.get('name', 'Unknown')
                 size = att.get('size', 0)
                 att_id = att.get('id', 'Unknown')
                 size_str = format_size(size)
-                print(f"  📎 {name} ({size_str})")
-                print(f"     ID: {att_id}")
+                lines.append(f"  📎 {name} ({size_str})")
+                lines.append(f"     ID: {att_id}")
 
         # Show inline attachments separately (collapsed by default)
         if inline_attachments:
-            print(f"\nInline Images ({len(inline_attachments)}) - signatures, embedded content:")
+            lines.append(f"\nInline Images ({len(inline_attachments)}) - signatures, embedded content:")
             for att in inline_attachments:
                 name = att.get('name', 'Unknown')
                 size = att.get('size', 0)
@@ -245,34 +567,30 @@ def display_message(msg, html=False):
                 size_str = format_size(size)
                 # Show CID if available (useful for debugging)
                 cid_str = f" [cid:{content_id}]" if content_id else ""
-                print(f"  🖼️  {name} ({size_str}){cid_str}")
-                print(f"     ID: {att_id}")
+                lines.append(f"  🖼️  {name} ({size_str}){cid_str}")
+                lines.append(f"     ID: {att_id}")
 
-    print("=" * 80 + "\n")
+    lines.append("=" * 80 + "\n")
 
-    # Print body
+    # Body
     body = msg.get('body', {})
     content_type = body.get('contentType', 'text')
     content = body.get('content', '')
 
     if content_type == 'html' and not html:
         # Convert HTML to plain text
-        h = html2text.HTML2Text()
-        h.ignore_links = False
-        h.ignore_images = True
-        content = h.handle(content)
+        content = _html_to_text(content, full_render)
 
-    print(content)
-    print("\n" + "=" * 80 + "\n")
+    lines.append(content)
+    lines.append("\n" + "=" * 80 + "\n")
+    _write_text('\n'.join(lines))
 
 
 def format_size(bytes_size):
     """Format byte size to human-readable string"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes_size < 1024.0:
-            return f"{bytes_size:.1f}{unit}"
-        bytes_size /= 1024.0
-    return f"{bytes_size:.1f}TB"
+    # The unit is picked from the bit length: every 10 bits is another 1024x
+    exponent = min((int(bytes_size).bit_length() - 1) // 10, 4) if bytes_size >= 1024 else 0
+    return f"{bytes_size / (1 << (10 * exponent)):.1f}{_SIZE_UNITS[exponent]}"
 
 
 # ============================================================================
@@ -280,7 +598,7 @@ def format_size(bytes_size):
 # ============================================================================
 
 def get_messages_structured(access_token, folder='Inbox', unread=None, since=None,
-                           search=None, limit=None):
+                           search=None, limit=None, attachments=True):
     """
     Get messages as structured data (for MCP/programmatic use).
 
@@ -291,6 +609,9 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
         since: Datetime object or None - filter messages received after this time
         search: Search query string
         limit: Maximum number of messages to return
+        attachments: Fetch attachment metadata; without it, has_real_attachments
+                     comes from Graph's hasAttachments (which already leaves
+                     inline images out) and no attachments arrays are returned
 
     Returns:
         list[dict]: List of message dictionaries with schema:
@@ -308,8 +629,8 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
                 'attachments': list[dict]  # Only if has_real_attachments
             }
     """
-    # Get user domain for external sender detection
-    user_domain = get_user_domain(access_token)
+    # Bind the user's domain once for external sender detection
+    is_external = make_external_check(get_user_domain(access_token))
 
     messages = []
     for page in get_messages_stream(
@@ -318,7 +639,8 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
         max_count=limit,
         since=since,
         unread=unread,
-        search=search
+        search=search,
+        attachments=attachments
     ):
         for msg in page:
             # Parse sender info
@@ -327,10 +649,10 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
             from_name = from_field.get('name', '')
 
             # Check if sender is external
-            is_ext = is_external_sender(from_email, user_domain)
+            is_ext = is_external(from_email)
 
             # Check for real attachments (not inline images)
-            has_real_atts = False
+            has_real_atts = False if attachments else msg.get('hasAttachments', False)
             real_attachments = []
             for att in msg.get('attachments', []):
                 if not att.get('isInline', False):
@@ -358,7 +680,7 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
             }
 
             # Only include attachments array if there are real attachments
-            if has_real_atts:
+            if real_attachments:
                 structured_msg['attachments'] = real_attachments
 
             messages.append(structured_msg)
@@ -366,23 +688,16 @@ def get_messages_structured(access_token, folder='Inbox', unread=None, since=Non
     return messages
 
 
-def get_message_by_id_structured(access_token, message_id):
-    """
-    Get a single message by ID as structured data.
+def _structure_message(msg, is_external):
+    """Convert a Graph message (with expanded attachments) to structured data
 
     Args:
-        access_token: OAuth2 access token
-        message_id: Graph API message ID
+        msg: Message object from Graph
+        is_external: Check from make_external_check
 
     Returns:
         dict: Message dictionary with full body content and attachments
     """
-    url = f"{GRAPH_API_BASE}/me/messages/{message_id}?$expand=attachments"
-    msg = make_graph_request(url, access_token)
-
-    if not msg:
-        return None
-
     # Parse sender
     from_field = msg.get('from', {}).get('emailAddress', {})
     from_email = from_field.get('address', '')
@@ -396,9 +711,8 @@ def get_message_by_id_structured(access_token, message_id):
             'name': r.get('emailAddress', {}).get('name', '')
         })
 
-    # Get user domain
-    user_domain = get_user_domain(access_token)
-    is_ext = is_external_sender(from_email, user_domain)
+    # Check if sender is external
+    is_ext = is_external(from_email)
 
     # Parse body
     body = msg.get('body', {})
@@ -445,6 +759,48 @@ def get_message_by_id_structured(access_token, message_id):
     }
 
 
+def get_message_by_id_structured(access_token, message_id):
+    """
+    Get a single message by ID as structured data.
+
+    Args:
+        access_token: OAuth2 access token
+        message_id: Graph API message ID
+
+    Returns:
+        dict: Message dictionary with full body content and attachments
+    """
+    url = f"{GRAPH_API_BASE}/me/messages/{message_id}?{_ATTACHMENTS_EXPAND_PARAM}"
+    msg = make_graph_request(url, access_token)
+
+    if not msg:
+        return None
+
+    return _structure_message(msg, make_external_check(get_user_domain(access_token)))
+
+
+def get_messages_by_ids_structured(access_token, message_ids):
+    """
+    Get several messages by ID as structured data.
+
+    The messages are fetched through Graph JSON batching, 20 per request.
+
+    Args:
+        access_token: OAuth2 access token
+        message_ids: List of Graph API message IDs
+
+    Returns:
+        list: Message dictionaries (as from get_message_by_id_structured) in
+              input order, with None for messages that couldn't be fetched
+    """
+    is_external = make_external_check(get_user_domain(access_token))
+
+    return [
+        _structure_message(msg, is_external) if msg else None
+        for _, msg in _batch_message_requests(access_token, message_ids, suffix=f'?{_ATTACHMENTS_EXPAND_PARAM}')
+    ]
+
+
 def send_email_structured(access_token, to_addresses, subject, body,
                           cc_addresses=None, bcc_addresses=None, is_html=True):
     """
@@ -513,19 +869,105 @@ def send_email_structured(access_token, to_addresses, subject, body,
 # CLI COMMAND FUNCTIONS
 # ============================================================================
 
+def _batch_message_requests(access_token, message_ids, method='GET', suffix='', body=None, headers=None):
+    """Send the same request for several messages through Graph JSON batching
+
+    Throttled sub-requests are retried up to BATCH_THROTTLE_RETRIES times.
+
+    Args:
+        access_token: OAuth2 access token
+        message_ids: List of message IDs
+        method: HTTP method for every request (default: GET)
+        suffix: Text appended to each /me/messages/{id} URL (e.g. '/move')
+        body: Optional JSON body sent with every request
+        headers: Optional dict of extra headers sent with every request
+
+    Returns:
+        List of (message ID, response body) tuples in input order; the body is
+        None for requests that failed
+    """
+    requests = []
+    for index, msg_id in enumerate(message_ids):
+        request = {'id': index, 'method': method, 'url': f'/me/messages/{msg_id}{suffix}'}
+        if body is not None:
+            request['body'] = body
+        if headers:
+            request['headers'] = headers
+        requests.append(request)
+
+    # Sub-requests throttled with 429 are sent again, after the longest
+    # Retry-After in their round
+    responses = {}
+    for attempt in range(BATCH_THROTTLE_RETRIES + 1):
+        round_responses = graph_batch(requests, access_token)
+        responses.update(round_responses)
+
+        throttled = [r for r in requests if round_responses.get(str(r['id']), {}).get('status') == 429]
+        if not throttled or attempt == BATCH_THROTTLE_RETRIES:
+            break
+
+        time.sleep(max(retry_delay(round_responses[str(r['id'])].get('headers'), attempt) for r in throttled))
+        requests = throttled
+
+    results = []
+    for index, msg_id in enumerate(message_ids):
+        response = responses.get(str(index))
+        if response and 200 <= response.get('status', 0) < 300:
+            results.append((msg_id, response.get('body') or {}))
+        else:
+            results.append((msg_id, None))
+    return results
+
+
+def _message_cache_name(msg_id, body_type):
+    """Get the cache name for a message fetched by ID
+
+    Args:
+        msg_id: Graph message ID
+        body_type: 'text' or 'html', since the two requests return different bodies
+
+    Returns:
+        Cache name for read_cache/write_cache
+    """
+    digest = hashlib.sha256(f"{body_type}:{msg_id}".encode()).hexdigest()
+    return f"{MESSAGE_CACHE_DIR_NAME}/{digest}"
+
+
 def cmd_read(args):
     """Handle 'o365 mail read' command using Graph API"""
     access_token = get_access_token()
 
     # If specific message IDs provided, fetch and display those messages
     if args.ids:
+        # Let Graph convert HTML bodies to text unless the HTML is wanted
+        body_type = 'html' if args.html or args.full_render else 'text'
+        headers = None if body_type == 'html' else _TEXT_BODY_HEADERS
+
+        # Messages cached by an earlier read (if enabled) need no request
+        messages = {}
+        if CACHE_MESSAGES:
+            for msg_id in args.ids:
+                msg = read_cache(_message_cache_name(msg_id, body_type), MESSAGE_CACHE_TTL)
+                if msg:
+                    messages[msg_id] = msg
+
+        missing = [msg_id for msg_id in dict.fromkeys(args.ids) if msg_id not in messages]
+        if missing:
+            fetched = _batch_message_requests(access_token, missing, suffix=f'?{_ATTACHMENTS_EXPAND_PARAM}',
+                                              headers=headers)
+            for msg_id, msg in fetched:
+                messages[msg_id] = msg
+                if CACHE_MESSAGES and msg:
+                    write_cache(_message_cache_name(msg_id, body_type), msg)
+            if CACHE_MESSAGES:
+                prune_cache(MESSAGE_CACHE_DIR_NAME, MESSAGE_CACHE_TTL)
+
         for msg_id in args.ids:
-            url = f"{GRAPH_API_BASE}/me/messages/{msg_id}?$expand=attachments"
-            msg = make_graph_request(url, access_token)
+            msg = messages.get(msg_id)
             if not msg:
                 print(f"Error: Message not found: {msg_id}", file=sys.stderr)
                 sys.exit(1)
-            display_message(msg, html=args.html)
+            display_message(msg, html=args.html, full_render=args.full_render)
         return
 
     # Otherwise, list messages with filters
@@ -549,8 +991,8 @@ def cmd_read(args):
     elif args.read:
         unread_filter = False
 
-    # Get user's domain for external sender detection
-    user_domain = get_user_domain(access_token)
+    # Bind the user's domain once for external sender detection
+    is_external = make_external_check(get_user_domain(access_token))
 
     # Stream and display messages as they're fetched
     total_displayed = 0
@@ -560,11 +1002,13 @@ def cmd_read(args):
         max_count=max_count,
         since=since,
         unread=unread_filter,
-        search=args.search
+        search=args.search,
+        attachments=False
     ):
-        for msg in page:
-            display_message_summary(msg, user_domain)
-            total_displayed += 1
+        # One write per page rather than four per message
+        sys.stdout.write(''.join([format_message_summary(msg, is_external) for msg in page]))
+        sys.stdout.flush()
+        total_displayed += len(page)
 
     if total_displayed == 0:
         print("No messages found")
@@ -577,60 +1021,56 @@ def cmd_archive(args):
     access_token = get_access_token()
 
     # Get Archive folder ID
-    archive_url = f"{GRAPH_API_BASE}/me/mailFolders"
-    folders_result = make_graph_request(archive_url, access_token)
+    folders = get_mail_folder_ids(access_token)
 
-    if not folders_result:
+    if folders is None:
         print("Error: Could not fetch mail folders", file=sys.stderr)
         sys.exit(1)
 
-    # Find Archive folder
-    archive_folder_id = None
-    for folder in folders_result.get('value', []):
-        if folder.get('displayName', '').lower() == 'archive':
-            archive_folder_id = folder['id']
-            break
+    archive_folder_id = folders.get('archive')
+    if not archive_folder_id:
+        # The cached list may predate the folder
+        folders = get_mail_folder_ids(access_token, refresh=True) or {}
+        archive_folder_id = folders.get('archive')
 
     if not archive_folder_id:
         print("Error: Archive folder not found", file=sys.stderr)
         sys.exit(1)
 
-    # Archive each message
-    for msg_id in args.ids:
-        if args.dry_run:
-            # Just fetch and display what would be archived
-            url = f"{GRAPH_API_BASE}/me/messages/{msg_id}"
-            msg = make_graph_request(url, access_token)
+    if args.dry_run:
+        # Just fetch and display what would be archived
+        for msg_id, msg in _batch_message_requests(access_token, args.ids, suffix='?$select=subject'):
             if msg:
                 subject = msg.get('subject', '(No subject)')
                 print(f"Would archive: {subject} (ID: {msg_id})")
             else:
                 print(f"Warning: Message not found: {msg_id}", file=sys.stderr)
-        else:
-            # Move message to Archive folder
-            move_url = f"{GRAPH_API_BASE}/me/messages/{msg_id}/move"
-            move_data = {'destinationId': archive_folder_id}
+        return
 
-            result = make_graph_request(move_url, access_token, method='POST', data=move_data)
+    # Move every message to the Archive folder
+    failed = False
+    move_data = {'destinationId': archive_folder_id}
+    for msg_id, result in _batch_message_requests(access_token, args.ids, 'POST', '/move', move_data):
+        if result is not None:
+            subject = result.get('subject', '(No subject)')
+            print(f"✓ Archived: {subject}")
+        else:
+            print(f"Error: Failed to archive message: {msg_id}", file=sys.stderr)
+            failed = True
 
-            if result:
-                subject = result.get('subject', '(No subject)')
-                print(f"✓ Archived: {subject}")
-            else:
-                print(f"Error: Failed to archive message: {msg_id}", file=sys.stderr)
-                sys.exit(1)
+    if failed:
+        # A stale cached folder ID fails every move; fetch it again next time
+        clear_cache(MAIL_FOLDERS_CACHE_NAME)
+        sys.exit(1)
 
 
 def cmd_mark_read(args):
     """Handle 'o365 mail mark-read' command using Graph API"""
     access_token = get_access_token()
 
-    # Mark each message as read
-    for msg_id in args.ids:
-        if args.dry_run:
-            # Just fetch and display what would be marked
-            url = f"{GRAPH_API_BASE}/me/messages/{msg_id}"
-            msg = make_graph_request(url, access_token)
+    if args.dry_run:
+        # Just fetch and display what would be marked
+        for msg_id, msg in _batch_message_requests(access_token, args.ids, suffix='?$select=subject,isRead'):
             if msg:
                 subject = msg.get('subject', '(No subject)')
                 is_read = msg.get('isRead', False)
@@ -638,28 +1078,30 @@ def cmd_mark_read(args):
                 print(f"{subject} ({status}) (ID: {msg_id})")
             else:
                 print(f"Warning: Message not found: {msg_id}", file=sys.stderr)
-        else:
-            # Update message isRead property
-            update_url = f"{GRAPH_API_BASE}/me/messages/{msg_id}"
-            update_data = {'isRead': True}
+        return
 
-            result = make_graph_request(update_url, access_token, method='PATCH', data=update_data)
+    # Update the isRead property of every message
+    failed = False
+    for msg_id, result in _batch_message_requests(access_token, args.ids, 'PATCH', body={'isRead': True}):
+        if result is not None:
+            subject = result.get('subject', '(No subject)')
+            print(f"✓ Marked as read: {subject}")
+        else:
+            print(f"Error: Failed to mark message as read: {msg_id}", file=sys.stderr)
+            failed = True
 
-            if result:
-                subject = result.get('subject', '(No subject)')
-                print(f"✓ Marked as read: {subject}")
-            else:
-                print(f"Error: Failed to mark message as read: {msg_id}", file=sys.stderr)
-                sys.exit(1)
+    if failed:
+        sys.exit(1)
 
 
 def cmd_download_attachment(args):
     """Handle 'o365 mail download-attachment' command using Graph API"""
     access_token = get_access_token()
 
-    # Download the attachment
+    # Fetch only the metadata; the content is streamed from $value below
+    # rather than decoded from a base64 contentBytes field held in memory
     url = f"{GRAPH_API_BASE}/me/messages/{args.message_id}/attachments/{args.attachment_id}"
-    attachment = make_graph_request(url, access_token)
+    attachment = make_graph_request(f"{url}?$select=name,size", access_token)
 
     if not attachment:
         print(f"Error: Attachment not found", file=sys.stderr)
@@ -667,15 +1109,6 @@ def cmd_download_attachment(args):
 
     # Get attachment details
     name = attachment.get('name', 'attachment')
-    content_bytes = attachment.get('contentBytes')
-
-    if not content_bytes:
-        print(f"Error: Attachment has no content", file=sys.stderr)
-        sys.exit(1)
-
-    # Decode base64 content
-    import base64
-    content = base64.b64decode(content_bytes)
 
     # Determine output path
     if args.output:
@@ -691,34 +1124,66 @@ def cmd_download_attachment(args):
         print("Use --overwrite to overwrite existing files", file=sys.stderr)
         sys.exit(1)
 
-    # Write attachment to file
+    # Stream the raw content into a temporary file next to the output and
+    # rename it into place, so a failed download leaves nothing behind
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_bytes(content)
+    partial = output_path.with_name(f".{output_path.name}.{os.getpid()}.part")
+
+    try:
+        with open(partial, 'wb') as f:
+            status, _, body = pooled_request('GET', f"{url}/$value", {
+                'Authorization': f'Bearer {access_token}'
+            }, sink=f)
+            size = f.tell()
+        if status != 200:
+            print(f"Error: Could not download attachment: {status} - {body.decode(errors='replace')}",
+                  file=sys.stderr)
+            sys.exit(1)
+        os.replace(partial, output_path)
+    finally:
+        partial.unlink(missing_ok=True)
 
     print(f"✓ Downloaded: {name}")
     print(f"  Saved to: {output_path}")
-    print(f"  Size: {format_size(len(content))}")
+    print(f"  Size: {format_size(size)}")
+
+
+def _find_email_module():
+    """Check whether trinoor.email is importable by this interpreter"""
+    import importlib.util
+
+    try:
+        return importlib.util.find_spec('trinoor.email') is not None
+    except ModuleNotFoundError:
+        return False
 
 
 def cmd_send(args):
     """Handle 'o365 mail send' command - calls trinoor.email module"""
-    cmd = ['python', '-m', 'trinoor.email']
+    # Everything after 'send' is collected by argparse for trinoor.email
+    send_args = args.passthrough
 
-    # Pass through all arguments from sys.argv
-    # We need to find where 'send' starts and pass everything after it
-    import sys as sys_module
-    try:
-        send_idx = sys_module.argv.index('send')
-        cmd.extend(sys_module.argv[send_idx + 1:])
-    except ValueError:
-        # Fallback: just run without args to show help
-        pass
+    # Run the module in this interpreter when it is importable, which saves
+    # starting a second Python process
+    if _find_email_module():
+        import runpy
+
+        saved_argv = sys.argv
+        sys.argv = ['trinoor.email'] + send_args
+        try:
+            runpy.run_module('trinoor.email', run_name='__main__', alter_sys=True)
+        finally:
+            sys.argv = saved_argv
+        sys.exit(0)
+
+    # Otherwise replace this process with whichever python is on PATH; its
+    # exit status becomes ours, so there is nothing to wait for
+    cmd = ['python', '-m', 'trinoor.email'] + send_args
 
+    sys.stdout.flush()
+    sys.stderr.flush()
     try:
-        result = subprocess.run(cmd, check=True)
-        sys.exit(result.returncode)
-    except subprocess.CalledProcessError as e:
-        sys.exit(e.returncode)
+        os.execvp(cmd[0], cmd)
     except FileNotFoundError:
         print("Error: trinoor.email module not found", file=sys.stderr)
         print("Make sure the trinoor package is installed", file=sys.stderr)
@@ -761,6 +1226,8 @@ def setup_parser(subparsers):
                             help='Show only read emails')
     read_parser.add_argument('--html', action='store_true',
                             help='Display HTML content as-is (default: convert to text)')
+    read_parser.add_argument('--full-render', action='store_true',
+                            help='Convert HTML with html2text, keeping links (slower for large emails)')
     read_parser.set_defaults(func=cmd_read)
 
     # o365 mail archive
@@ -803,6 +1270,8 @@ def setup_parser(subparsers):
     send_parser = subparsers.add_parser(
         'send',
         help='Send email via SMTP',
+        add_help=False,
+        prefix_chars='+',
         description='Send emails via SMTP with automatic signature support. '
                    'This is a wrapper around the trinoor.email module.',
         epilog="""
@@ -814,8 +1283,10 @@ Examples:
 For full options, see: python -m trinoor.email --help
 """
     )
-    # Note: We're not adding arguments here because we pass everything through to trinoor.email
-    # This allows trinoor.email to handle its own argument parsing
+    # Every argument after 'send' (including -h/--help) is passed through to
+    # trinoor.email, which does its own argument parsing; '+' as the prefix
+    # keeps argparse from treating the '-' options as its own
+    send_parser.add_argument('passthrough', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
     send_parser.set_defaults(func=cmd_send)
 
     # o365 mail download-attachment
@@ -67,6 +67,14 @@ def mock_config(temp_config_file, temp_token_file):
         yield
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path):
+    """Give every test its own empty cache directory"""
+    cache_dir = tmp_path / "cache"
+    with patch('o365.common.CACHE_DIR', cache_dir):
+        yield cache_dir
+
+
 @pytest.fixture
 def mock_graph_api():
     """Mock Graph API responses in all modules
@@ -325,6 +333,7 @@ def pytest_configure(config):
     os.environ['O365_CONFIG_DIR'] = str(_TEST_DIR)
     os.environ['O365_TOKEN_FILE'] = str(test_token_file)
     os.environ['O365_MAIL_DIR'] = str(_TEST_DIR / 'mail')
+    os.environ['O365_CACHE_DIR'] = str(_TEST_DIR / 'cache')
 
     # Set dummy credentials for unit tests (integration tests will use copied config)
     if not os.environ.get('O365_CLIENT_ID'):
@@ -5,7 +5,7 @@ Tests for o365 auth commands
 import pytest
 import json
 from unittest.mock import patch, MagicMock, call
-from o365 import auth
+from o365 import auth, common
 
 
 class TestAuthLogin:
@@ -84,6 +84,33 @@ class TestAuthLogin:
                     auth.cmd_login(args)
 
 
+class TestLoginClearsCaches:
+    """Tests for cache cleanup after 'o365 auth login'"""
+
+    def test_foreign_files_survive_login(self, isolated_cache_dir):
+        """Test that login only removes this package's account caches"""
+        token_file = isolated_cache_dir / "tokens.json"
+        foreign = isolated_cache_dir / "other-tool.json"
+        nested = isolated_cache_dir / "other" / "state.json"
+        nested.parent.mkdir(parents=True)
+        foreign.write_text('{"keep": true}')
+        nested.write_text('{}')
+        common.write_cache('user_domain', 'old.example.com')
+
+        device_code = {'device_code': 'code', 'user_code': 'TEST123', 'interval': 0,
+                       'verification_uri': 'https://microsoft.com/devicelogin', 'expires_in': 900}
+        tokens = {'access_token': 'new-access-token', 'expires_in': 3600}
+
+        with patch('o365.common.TOKEN_FILE', token_file), \
+             patch('o365.auth.make_oauth_request', side_effect=[device_code, tokens]), \
+             patch('time.sleep'):
+            auth.device_code_flow()
+
+        assert token_file.exists()
+        assert foreign.exists() and nested.exists()
+        assert common.read_cache('user_domain', 60) is None
+
+
 class TestAuthRefresh:
     """Tests for 'o365 auth refresh' command"""
 
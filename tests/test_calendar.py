@@ -271,3 +271,15 @@ class TestParseSinceExpression:
         """Test parsing invalid expression"""
         with pytest.raises(ValueError):
             calendar_mod.parse_since_expression("not a valid date")
+
+
+class TestParseGraphDatetime:
+    """Tests for parse_graph_datetime helper function"""
+
+    def test_event_times(self):
+        """Test 7-digit event times without an offset and 'Z' timestamps"""
+        from datetime import timezone
+
+        dt = calendar_mod.parse_graph_datetime('2024-01-15T10:00:00.0000000')
+        assert dt == datetime(2024, 1, 15, 10, tzinfo=timezone.utc)
+        assert calendar_mod.parse_graph_datetime('2024-01-15T10:00:00Z') == dt
@@ -185,3 +185,20 @@ class TestChatSearch:
 
         captured = capsys.readouterr()
         assert "No messages found" in captured.out or "0 messages" in captured.out
+
+
+class TestParseGraphDatetime:
+    """Tests for parse_graph_datetime helper function"""
+
+    def test_fractions_normalized(self):
+        """Test that short and long fractional seconds both parse"""
+        assert chat.parse_graph_datetime('2024-01-15T10:30:45.12Z').microsecond == 120000
+        assert chat.parse_graph_datetime('2024-01-15T10:30:45.1234567Z').microsecond == 123456
+
+    def test_offsets(self):
+        """Test 'Z', explicit and missing offsets"""
+        from datetime import timedelta
+
+        assert chat.parse_graph_datetime('2024-01-15T10:30:45Z').utcoffset() == timedelta(0)
+        assert chat.parse_graph_datetime('2024-01-15T10:30:45-05:00').utcoffset() == timedelta(hours=-5)
+        assert chat.parse_graph_datetime('2024-01-15T10:30:45').utcoffset() == timedelta(0)
@@ -129,6 +129,19 @@ class TestConfigSet:
         assert parser.has_section('newsection')
         assert parser.get('newsection', 'option') == 'value'
 
+    def test_set_keeps_file_private(self, temp_config_file):
+        """Test that set leaves the config file readable by owner only"""
+        temp_config_file.chmod(0o644)
+
+        args = MagicMock()
+        args.key = 'auth.tenant'
+        args.value = 'common'
+
+        with patch('o365.config_cmd.CONFIG_FILE', temp_config_file):
+            config_cmd.cmd_set(args)
+
+        assert temp_config_file.stat().st_mode & 0o777 == 0o600
+
 
 class TestConfigUnset:
     """Tests for 'o365 config unset' command"""
@@ -190,6 +190,16 @@ class TestGetContacts:
         assert len(result) == 1
         assert result[0]['email'] == 'has@example.com'
 
+    def test_get_contacts_selects_used_fields(self, mock_access_token):
+        """Test that get_contacts only requests the fields it uses"""
+        with patch('o365.contacts.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': []}
+
+            contacts.get_contacts('test-token')
+
+        url = mock_request.call_args[0][0]
+        assert '$select=id,displayName,emailAddresses' in url
+
 
 class TestSearchUsers:
     """Tests for search_users helper function"""
@@ -44,6 +44,22 @@ class TestFilesDrives:
         captured = capsys.readouterr()
         assert "drive-1" in captured.out
 
+    def test_drives_written_in_one_call(self, mock_access_token, capsys):
+        """Test that the drive table is written to stdout in a single call"""
+        args = MagicMock()
+        args.verbose = True
+
+        with patch('o365.files.get_drives') as mock_get, \
+             patch('o365.files._flush_rows', wraps=files._flush_rows) as mock_flush:
+            mock_get.return_value = [
+                {'id': f'drive-{i}', 'name': f'Drive {i}', 'driveType': 'business'}
+                for i in range(3)
+            ]
+            files.cmd_drives(args)
+
+        mock_flush.assert_called_once()
+        assert "drive-2" in capsys.readouterr().out
+
 
 class TestFilesList:
     """Tests for 'o365 files list' command"""
@@ -93,6 +109,342 @@ class TestFilesList:
         captured = capsys.readouterr()
         assert "1024" in captured.out or "1.0KB" in captured.out
 
+    def test_list_requests_only_table_fields(self, mock_access_token, mock_graph_api, sample_file):
+        """Test that the listing asks Graph only for the columns it shows"""
+        mock_graph_api.return_value = {'value': [sample_file]}
+
+        args = MagicMock()
+        args.path = None
+        args.drive = None
+        args.long = True
+        args.recursive = False
+        args.since = None
+
+        files.cmd_list(args)
+
+        url = mock_graph_api.call_args[0][0]
+        assert url.endswith('?$select=id,name,size,folder,lastModifiedDateTime')
+
+    def test_list_empty_folder(self, mock_access_token, mock_graph_api, capsys):
+        """Test that an empty folder reports no files"""
+        mock_graph_api.return_value = {'value': []}
+
+        args = MagicMock()
+        args.path = "/Empty"
+        args.drive = None
+        args.long = False
+        args.recursive = False
+        args.since = None
+
+        files.cmd_list(args)
+
+        captured = capsys.readouterr()
+        assert "No files found in /Empty" in captured.out
+
+    def test_list_prints_rows_as_they_arrive(self, mock_access_token, sample_file, capsys):
+        """Test that rows are printed before the listing is exhausted"""
+        def items():
+            yield dict(sample_file, _type='file')
+            # The first row must already be on stdout
+            assert "document.pdf" in capsys.readouterr().out
+            yield dict(sample_file, name='second.pdf', _type='file')
+
+        args = MagicMock()
+        args.path = None
+        args.drive = None
+        args.long = False
+        args.recursive = False
+        args.since = None
+
+        with patch('o365.files.iter_files', return_value=items()), \
+             patch('o365.files.OUTPUT_BLOCK_ROWS', 1):
+            files.cmd_list(args)
+
+        captured = capsys.readouterr()
+        assert "second.pdf" in captured.out
+        assert "2 items" in captured.out
+
+
+class TestGetDrives:
+    """Tests for get_drives helper function"""
+
+    def test_deduplicates_personal_drive(self, mock_access_token):
+        """Test that the personal drive is listed once, in first position"""
+        personal = {'id': 'drive-1', 'name': 'OneDrive'}
+
+        with patch('o365.files.get_personal_drive', return_value=personal), \
+             patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': [
+                {'id': 'drive-2', 'name': 'Team Site'},
+                {'id': 'drive-1', 'name': 'OneDrive (again)'}
+            ]}
+
+            drives = files.get_drives('test-token')
+
+        assert [d['id'] for d in drives] == ['drive-1', 'drive-2']
+        assert drives[0] is personal
+
+
+class TestResolveDrive:
+    """Tests for resolve_drive helper function"""
+
+    def test_drive_id_fetched_directly(self, mock_access_token):
+        """Test that a drive ID is resolved without enumerating drives"""
+        drive_id = 'b!' + 'x' * 64
+
+        with patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files.get_drives') as mock_get_drives:
+            mock_request.return_value = {'id': drive_id, 'name': 'Team Site'}
+
+            drive = files.resolve_drive(drive_id, 'test-token')
+
+        assert drive['name'] == 'Team Site'
+        mock_request.assert_called_once_with(f'/drives/{drive_id}', 'test-token')
+        mock_get_drives.assert_not_called()
+
+    def test_name_uses_fuzzy_match(self, mock_access_token):
+        """Test that drive names still go through the drive list"""
+        with patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files.get_drives') as mock_get_drives, \
+             patch.dict('o365.files._DRIVE_INDEX_CACHE', clear=True):
+            mock_get_drives.return_value = [{'id': 'drive-2', 'name': 'Team Site'}]
+
+            drive = files.resolve_drive('team', 'test-token')
+
+        assert drive['id'] == 'drive-2'
+        mock_request.assert_not_called()
+
+    def test_drive_list_fetched_once(self, mock_access_token):
+        """Test that repeated lookups reuse the fetched drive list"""
+        with patch('o365.files.get_drives') as mock_get_drives, \
+             patch.dict('o365.files._DRIVE_INDEX_CACHE', clear=True):
+            mock_get_drives.return_value = [
+                {'id': 'drive-1', 'name': 'OneDrive'},
+                {'id': 'drive-2', 'name': 'Team Site'}
+            ]
+
+            assert files.resolve_drive('onedrive', 'test-token')['id'] == 'drive-1'
+            assert files.resolve_drive('site', 'test-token')['id'] == 'drive-2'
+            assert files.resolve_drive('drive-2', 'test-token')['id'] == 'drive-2'
+
+        mock_get_drives.assert_called_once()
+
+    def test_drive_list_read_from_disk_cache(self, mock_access_token):
+        """Test that a later run resolves names from the on-disk drive cache"""
+        drives = [{'id': 'drive-2', 'name': 'Team Site'}]
+
+        with patch('o365.files.get_drives', return_value=drives) as mock_get_drives:
+            with patch.dict('o365.files._DRIVE_INDEX_CACHE', clear=True):
+                files.resolve_drive('team', 'test-token')
+            # A fresh process only has the disk cache
+            with patch.dict('o365.files._DRIVE_INDEX_CACHE', clear=True):
+                assert files.resolve_drive('team', 'test-token')['id'] == 'drive-2'
+
+        mock_get_drives.assert_called_once()
+
+    def test_unknown_name_refetches_cached_list(self, mock_access_token):
+        """Test that a name missing from the cache triggers a fresh drive list"""
+        from o365.common import write_cache
+        write_cache(files.DRIVES_CACHE_NAME, [{'id': 'drive-1', 'name': 'OneDrive'}])
+
+        with patch('o365.files.get_drives') as mock_get_drives, \
+             patch.dict('o365.files._DRIVE_INDEX_CACHE', clear=True):
+            mock_get_drives.return_value = [
+                {'id': 'drive-1', 'name': 'OneDrive'},
+                {'id': 'drive-3', 'name': 'New Site'}
+            ]
+
+            assert files.resolve_drive('new site', 'test-token')['id'] == 'drive-3'
+
+        mock_get_drives.assert_called_once()
+
+
+class TestGetPersonalDrive:
+    """Tests for get_personal_drive helper function"""
+
+    def test_cached_per_token(self, mock_access_token):
+        """Test that /me/drive is fetched once per access token"""
+        with patch('o365.files.make_graph_request') as mock_request, \
+             patch.dict('o365.files._PERSONAL_DRIVE_CACHE', clear=True):
+            mock_request.return_value = {'id': 'drive-1'}
+
+            assert files.get_personal_drive('token-a')['id'] == 'drive-1'
+            assert files.get_personal_drive('token-a')['id'] == 'drive-1'
+            files.get_personal_drive('token-b')
+
+        assert mock_request.call_count == 2
+
+    def test_failure_not_cached(self, mock_access_token):
+        """Test that a failed lookup is retried on the next call"""
+        with patch('o365.files.make_graph_request') as mock_request, \
+             patch.dict('o365.files._PERSONAL_DRIVE_CACHE', clear=True):
+            mock_request.side_effect = [None, {'id': 'drive-1'}]
+
+            assert files.get_personal_drive('token-a') is None
+            assert files.get_personal_drive('token-a')['id'] == 'drive-1'
+
+
+class TestListFiles:
+    """Tests for list_files helper function"""
+
+    def test_recursive_lists_nested_folders(self, mock_access_token):
+        """Test that recursive listing descends into every subfolder"""
+        tree = {
+            'root/children': [{'name': 'A', 'folder': {}}, {'name': 'B', 'folder': {}}, {'name': 'top.txt'}],
+            'root:/A:/children': [{'name': 'C', 'folder': {}}, {'name': 'a.txt'}],
+            'root:/B:/children': [{'name': 'b.txt'}],
+            'root:/A/C:/children': [{'name': 'c.txt'}],
+        }
+
+        def fake_request(url, access_token, method='GET', data=None):
+            if url == '/$batch':
+                return {'responses': [
+                    {'id': r['id'], 'status': 200, 'body': fake_request(r['url'], access_token)}
+                    for r in data['requests']
+                ]}
+            return {'value': tree[url.split('/drives/drive-1/', 1)[1].split('?')[0]]}
+
+        with patch('o365.common.make_graph_request', side_effect=fake_request) as mock_request:
+            items = list(files.list_files('test-token', '/', drive_id='drive-1', recursive=True))
+
+        names = sorted(item['name'] for item in items)
+        assert names == ['A', 'B', 'C', 'a.txt', 'b.txt', 'c.txt', 'top.txt']
+        # Sibling folders A and B are listed in one $batch call
+        batch_calls = [c for c in mock_request.call_args_list if c.args[0] == '/$batch']
+        assert len(batch_calls) == 1
+
+    def test_subfolders_listed_by_item_id(self, mock_access_token):
+        """Test that discovered subfolders are addressed by ID rather than path"""
+        with patch('o365.files._list_one_folder') as mock_list, \
+             patch('o365.files.graph_batch') as mock_batch:
+            mock_list.return_value = [
+                {'id': 'id-a', 'name': 'A b', 'folder': {}, '_type': 'folder'},
+                {'id': 'id-b', 'name': 'B', 'folder': {}, '_type': 'folder'}
+            ]
+            mock_batch.return_value = {'0': {'status': 200, 'body': {'value': []}},
+                                       '1': {'status': 200, 'body': {'value': []}}}
+
+            list(files.list_files('test-token', '/', drive_id='drive-1', recursive=True))
+
+        urls = sorted(r['url'].split('?')[0] for r in mock_batch.call_args[0][0])
+        assert urls == ['/drives/drive-1/items/id-a/children', '/drives/drive-1/items/id-b/children']
+
+    def test_throttled_batch_request_requeued(self, mock_access_token):
+        """Test that a 429 sub-response is retried after its Retry-After delay"""
+        throttled = {'status': 429, 'headers': {'Retry-After': '2'}, 'body': {}}
+        ok = {'status': 200, 'body': {'value': [{'name': 'x.txt'}]}}
+
+        with patch('o365.files.graph_batch') as mock_batch, \
+             patch('o365.files.time.sleep') as mock_sleep:
+            mock_batch.side_effect = [{'0': ok, '1': throttled}, {'1': ok}]
+
+            result = files._list_children_batch('test-token', None, ['/A', '/B'])
+
+        assert [len(items) for _, items in result] == [1, 1]
+        assert [r['id'] for r in mock_batch.call_args_list[1][0][0]] == ['1']
+        mock_sleep.assert_called_once_with(2)
+
+    def test_throttled_without_usable_retry_after_backs_off(self, mock_access_token):
+        """Test that a dated or missing Retry-After falls back to exponential backoff"""
+        from o365 import common
+        dated = {'status': 429, 'headers': {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'}, 'body': {}}
+        bare = {'status': 429, 'body': {}}
+        ok = {'status': 200, 'body': {'value': [{'name': 'x.txt'}]}}
+
+        with patch('o365.files.graph_batch') as mock_batch, \
+             patch('o365.files.time.sleep') as mock_sleep:
+            mock_batch.side_effect = [{'0': dated}, {'0': bare}, {'0': ok}]
+
+            result = files._list_children_batch('test-token', None, ['/A'])
+
+        assert [len(items) for _, items in result] == [1]
+        assert [c[0][0] for c in mock_sleep.call_args_list] == [common.GRAPH_RETRY_DELAY,
+                                                                 common.GRAPH_RETRY_DELAY * 2]
+
+    def test_personal_drive_needs_no_lookup(self, mock_access_token):
+        """Test that listing the personal drive goes straight to /me/drive"""
+        with patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': []}
+
+            list(files.list_files('test-token', '/Documents'))
+
+        mock_request.assert_called_once()
+        assert mock_request.call_args[0][0].startswith('/me/drive/root:/Documents:/children?$select=')
+
+    def test_flat_listing_returns_list(self, mock_access_token):
+        """Test that a non-recursive listing is a plain list of one folder"""
+        with patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': [{'name': 'A', 'folder': {}}]}
+
+            items = files.list_files('test-token', '/', drive_id='drive-1')
+
+        assert isinstance(items, list)
+        assert mock_request.call_count == 1
+
+    def test_yields_before_descending(self, mock_access_token):
+        """Test that items are yielded lazily, fetching at most one group of folders ahead"""
+        with patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': [{'name': 'A', 'folder': {}}]}
+
+            items = files.list_files('test-token', '/', drive_id='drive-1', recursive=True)
+            assert next(items)['name'] == 'A'
+            assert mock_request.call_count <= 2
+            items.close()
+
+    def test_next_folders_prefetched(self, mock_access_token):
+        """Test that subfolders are requested before the parent listing is consumed"""
+        from concurrent.futures import Future
+        submitted = []
+
+        class FakeExecutor:
+            def __init__(self, **kwargs):
+                pass
+
+            def submit(self, fn, *args):
+                submitted.append([path for path, _ in args[2]])
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+            def shutdown(self, **kwargs):
+                pass
+
+        with patch('o365.files.ThreadPoolExecutor', FakeExecutor), \
+             patch('o365.files._list_one_folder') as mock_list:
+            mock_list.side_effect = lambda token, drive, path, since, item_id=None, select=None: (
+                [{'name': 'A', 'folder': {}, '_type': 'folder'}] if path == '/' else [])
+
+            items = files.list_files('test-token', '/', drive_id='drive-1', recursive=True)
+            assert next(items)['name'] == 'A'
+            assert submitted == [['/A']]
+            assert list(items) == []
+
+    def test_walk_independent_of_shared_prefetch_pool(self, mock_access_token):
+        """Test that walking folders doesn't need a free shared prefetch worker"""
+        import threading
+        from o365 import common
+        release = threading.Event()
+        blockers = [common.submit_prefetch(release.wait) for _ in range(4)]
+        result = []
+
+        def walk():
+            result.extend(files.list_files('test-token', '/', drive_id='drive-1', recursive=True))
+
+        try:
+            with patch('o365.files._list_one_folder') as mock_list:
+                mock_list.side_effect = lambda token, drive, path, since, item_id=None, select=None: (
+                    [{'name': 'A', 'folder': {}, '_type': 'folder'}] if path == '/' else [])
+                walker = threading.Thread(target=walk)
+                walker.start()
+                walker.join(timeout=5)
+                assert not walker.is_alive()
+        finally:
+            release.set()
+            for future in blockers:
+                future.result()
+
+        assert [item['name'] for item in result] == ['A']
+
 
 class TestFilesSearch:
     """Tests for 'o365 files search' command"""
@@ -128,6 +480,27 @@ class TestFilesSearch:
         assert "document.pdf" in captured.out
 
 
+    def test_search_row_truncates_name_and_path(self, mock_access_token, sample_file, capsys):
+        """Test that long names/paths are cut to the column width and the drive root prefix is dropped"""
+        item = dict(sample_file, name='n' * 50, _type='file',
+                    parentReference={'path': '/drive/root:/' + 'p' * 50})
+
+        args = MagicMock()
+        args.query = "n"
+        args.drive = None
+        args.type = None
+        args.since = None
+        args.count = 50
+
+        with patch('o365.files.iter_search_files', return_value=iter([item])):
+            files.cmd_search(args)
+
+        out = capsys.readouterr().out
+        assert 'n' * 38 + '   /' + 'p' * 37 + '  \n' in out
+        assert 'n' * 39 not in out
+        assert '/drive/root:' not in out
+
+
 class TestFilesDownload:
     """Tests for 'o365 files download' command"""
 
@@ -150,6 +523,74 @@ class TestFilesDownload:
         assert "Downloaded" in captured.out or "document.pdf" in captured.out
 
 
+class TestCmdDownload:
+    """Tests for cmd_download with the drive/item lookup"""
+
+    def _args(self, tmp_path, drive=None):
+        args = MagicMock()
+        args.source = '/Documents/report.pdf'
+        args.dest = str(tmp_path)
+        args.drive = drive
+        args.recursive = False
+        args.overwrite = False
+        return args
+
+    def test_personal_drive_single_request(self, mock_access_token, sample_file, tmp_path):
+        """Test that the item is fetched in one request and supplies the drive ID"""
+        item = dict(sample_file, parentReference={'driveId': 'drive-1', 'path': '/drive/root:/Documents'})
+
+        with patch('o365.files.make_graph_request', return_value=item) as mock_request, \
+             patch('o365.files.download_file', return_value=True) as mock_download:
+            files.cmd_download(self._args(tmp_path))
+
+        mock_request.assert_called_once()
+        assert mock_request.call_args[0][0].startswith('/me/drive/root:/Documents/report.pdf?$select=')
+        assert mock_download.call_args[0][3] == 'drive-1'
+
+    def test_drive_id_used_directly(self, mock_access_token, sample_file, tmp_path):
+        """Test that a drive ID is addressed without resolving it first"""
+        drive_id = 'b!abc123'
+
+        with patch('o365.files.make_graph_request', return_value=sample_file) as mock_request, \
+             patch('o365.files.resolve_drive') as mock_resolve, \
+             patch('o365.files.download_file', return_value=True) as mock_download:
+            files.cmd_download(self._args(tmp_path, drive=drive_id))
+
+        mock_resolve.assert_not_called()
+        assert mock_request.call_args[0][0].startswith(f'/drives/{drive_id}/root:/Documents/report.pdf')
+        assert mock_download.call_args[0][3] == drive_id
+
+    def test_recursive_folder_download(self, mock_access_token, tmp_path):
+        """Test that --recursive mirrors the folder tree locally"""
+        tree = {
+            'Documents': [{'id': 'a', 'name': 'a.txt', '_type': 'file'},
+                          {'id': 'sub', 'name': 'Sub', '_type': 'folder'}],
+            'Documents/Sub': [{'id': 'b', 'name': 'b.txt', '_type': 'file'}],
+        }
+        args = self._args(tmp_path)
+        args.source = '/Documents'
+        args.recursive = True
+        args.parallel = 4
+
+        with patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files._list_one_folder', side_effect=lambda t, d, path, since, item_id=None, select=None: tree[path.strip('/')]), \
+             patch('o365.files.download_file', return_value=True) as mock_download:
+            mock_request.return_value = {'id': 'docs', 'name': 'Documents', 'folder': {},
+                                         'parentReference': {'driveId': 'drive-1'}}
+
+            files.cmd_download(args)
+
+        dests = sorted(call.args[2] for call in mock_download.call_args_list)
+        assert dests == [tmp_path / 'Documents' / 'Sub' / 'b.txt', tmp_path / 'Documents' / 'a.txt']
+        assert {call.args[3] for call in mock_download.call_args_list} == {'drive-1'}
+
+    def test_missing_item(self, mock_access_token, tmp_path):
+        """Test that a missing item exits with an error"""
+        with patch('o365.files.make_graph_request', return_value=None):
+            with pytest.raises(SystemExit):
+                files.cmd_download(self._args(tmp_path))
+
+
 class TestFilesUpload:
     """Tests for 'o365 files upload' command"""
 
@@ -173,6 +614,404 @@ class TestFilesUpload:
         assert "Uploaded" in captured.out or "test.txt" in captured.out
 
 
+class TestPagination:
+    """Tests for paginated listings"""
+
+    def test_follows_next_links(self, mock_access_token):
+        """Test that every page of a folder listing is returned in order"""
+        pages = [
+            {'value': [{'name': 'one'}], '@odata.nextLink': 'https://graph.microsoft.com/v1.0/next1'},
+            {'value': [{'name': 'two'}], '@odata.nextLink': 'https://graph.microsoft.com/v1.0/next2'},
+            {'value': [{'name': 'three'}]}
+        ]
+
+        with patch('o365.common.make_graph_request', side_effect=pages) as mock_request:
+            items = list(files.list_files('test-token', '/', drive_id='drive-1'))
+
+        assert [item['name'] for item in items] == ['one', 'two', 'three']
+        assert mock_request.call_count == 3
+
+    def test_items_are_classified(self, mock_access_token):
+        """Test that listed items carry their folder/file type"""
+        with patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': [{'name': 'Docs', 'folder': {}}, {'name': 'a.txt', 'file': {}}]}
+
+            items = list(files.list_files('test-token', '/', drive_id='drive-1'))
+
+        assert [item['_type'] for item in items] == ['folder', 'file']
+
+
+class TestDownloadFile:
+    """Tests for download_file helper function"""
+
+    def _fake_response(self, data, status=200):
+        import io
+        response = io.BytesIO(data)
+        response.status = status
+        return response
+
+    def _fake_pooled(self, data, redirect=None):
+        """Fake pooled_request that streams data into the sink"""
+        def fake_pooled_request(method, url, headers=None, body=None, sink=None):
+            if redirect and url != redirect:
+                return 302, {'Location': redirect}, b''
+            sink.write(data)
+            return 200, {}, b''
+        return fake_pooled_request
+
+    def test_streams_to_disk(self, tmp_path):
+        """Test that small files are streamed from the content endpoint's redirect"""
+        dest = tmp_path / "sub" / "file.txt"
+        location = 'https://download.example.com/file'
+
+        with patch('o365.files.pooled_request',
+                   side_effect=self._fake_pooled(b"hello world", redirect=location)) as mock_request:
+            assert files.download_file('test-token', 'item-1', dest, drive_id='drive-1')
+
+        assert dest.read_bytes() == b"hello world"
+        first, second = mock_request.call_args_list
+        assert first[0][1].endswith('/drives/drive-1/items/item-1/content')
+        assert first[0][2] == {'Authorization': 'Bearer test-token'}
+        assert second[0][1] == location
+
+    def test_uses_download_url_from_item(self, tmp_path):
+        """Test that a listed item's pre-authenticated URL skips the redirect"""
+        dest = tmp_path / "file.txt"
+        item = {'id': 'item-1', 'size': 11, '@microsoft.graph.downloadUrl': 'https://download.example.com/f'}
+
+        with patch('o365.files.pooled_request', side_effect=self._fake_pooled(b"hello world")) as mock_request:
+            assert files.download_file('test-token', 'item-1', dest, item=item)
+
+        assert dest.read_bytes() == b"hello world"
+        mock_request.assert_called_once()
+        assert mock_request.call_args[0][1] == 'https://download.example.com/f'
+
+    def test_preallocated_file_trimmed_to_body(self, tmp_path):
+        """Test that space reserved from the listed size doesn't outlive a shorter body"""
+        dest = tmp_path / "file.txt"
+        item = {'id': 'item-1', 'name': 'file.txt', 'size': 4096,
+                '@microsoft.graph.downloadUrl': 'https://download.example.com/f'}
+
+        with patch('o365.files.pooled_request', side_effect=self._fake_pooled(b"hello world")):
+            assert files.download_file('test-token', 'item-1', dest, item=item)
+
+        assert dest.read_bytes() == b"hello world"
+
+    def test_preallocate_falls_back_to_ftruncate(self, tmp_path):
+        """Test that filesystems without fallocate support still get sized files"""
+        path = tmp_path / "file.bin"
+
+        with open(path, 'wb') as f, \
+             patch('o365.files.os.posix_fallocate', side_effect=OSError(95, 'not supported'), create=True):
+            files._preallocate(f.fileno(), 1000)
+
+        assert path.stat().st_size == 1000
+
+    def test_failed_download_keeps_existing_file(self, tmp_path):
+        """Test that an interrupted download leaves no partial file behind"""
+        dest = tmp_path / "file.txt"
+        dest.write_bytes(b"old content")
+
+        def fake_pooled_request(method, url, headers=None, body=None, sink=None):
+            sink.write(b"partial")
+            raise ConnectionResetError("reset")
+
+        with patch('o365.files.pooled_request', side_effect=fake_pooled_request):
+            assert not files.download_file('test-token', 'item-1', dest)
+
+        assert dest.read_bytes() == b"old content"
+        assert list(tmp_path.iterdir()) == [dest]
+
+    def test_skip_unchanged(self, tmp_path):
+        """Test that an identical local file is not downloaded again"""
+        dest = tmp_path / "file.txt"
+        dest.write_bytes(b"same content")
+        item = {'id': 'item-1', 'size': 12,
+                'file': {'hashes': {'quickXorHash': files.quick_xor_hash(dest)}}}
+
+        with patch('o365.files.pooled_request') as mock_request:
+            assert files.download_file('test-token', 'item-1', dest, item=item, skip_unchanged=True)
+
+        mock_request.assert_not_called()
+
+    def test_large_file_uses_parallel_ranges(self, tmp_path):
+        """Test that large files are assembled from parallel range requests"""
+        dest = tmp_path / "big.bin"
+        data = bytes(range(256)) * 4
+        item = {'size': len(data), '@microsoft.graph.downloadUrl': 'https://download.example.com/f'}
+
+        def fake_urlopen(req):
+            start, end = map(int, req.get_header('Range').split('=')[1].split('-'))
+            return self._fake_response(data[start:end + 1], status=206)
+
+        with patch('o365.files.DOWNLOAD_RANGE_THRESHOLD', 100), \
+             patch('o365.files.DOWNLOAD_RANGE_SIZE', 300), \
+             patch('o365.files.urllib.request.urlopen', side_effect=fake_urlopen) as mock_urlopen:
+            assert files.download_file('test-token', 'item-1', dest, item=item)
+
+        assert mock_urlopen.call_count == 4
+        assert dest.read_bytes() == data
+
+
+class TestQuickXorHash:
+    """Tests for quick_xor_hash helper function"""
+
+    def _reference(self, data):
+        """Byte-at-a-time version of the published algorithm"""
+        import base64
+        value = 0
+        for i, byte in enumerate(data):
+            rotated = byte << ((i * 11) % 160)
+            value ^= (rotated & ((1 << 160) - 1)) | (rotated >> 160)
+        value ^= len(data) << 96
+        return base64.b64encode(value.to_bytes(20, 'little')).decode()
+
+    def test_known_values(self, tmp_path):
+        """Test the empty file and a single byte"""
+        empty = tmp_path / "empty"
+        empty.write_bytes(b"")
+        one = tmp_path / "one"
+        one.write_bytes(b"J")
+
+        assert files.quick_xor_hash(empty) == "AAAAAAAAAAAAAAAAAAAAAAAAAAA="
+        assert files.quick_xor_hash(one) == "SgAAAAAAAAAAAAAAAQAAAAAAAAA="
+
+    def test_matches_reference_across_chunks(self, tmp_path):
+        """Test the folded implementation against the byte-wise reference"""
+        import random
+        data = random.Random(0).randbytes(160 * 4096 + 1234)
+        path = tmp_path / "data"
+        path.write_bytes(data)
+
+        assert files.quick_xor_hash(path) == self._reference(data)
+
+
+class TestDownloadFiles:
+    """Tests for download_files helper function"""
+
+    def test_downloads_every_item(self, tmp_path):
+        """Test that each item is downloaded into dest_dir and reported"""
+        items = [{'id': f'item-{i}', 'name': f'file{i}.txt'} for i in range(5)]
+
+        with patch('o365.files.download_file', return_value=True) as mock_download:
+            results = list(files.download_files('test-token', items, tmp_path, max_workers=3))
+
+        assert sorted(item['id'] for item, ok in results if ok) == [f'item-{i}' for i in range(5)]
+        dests = sorted(call.args[2] for call in mock_download.call_args_list)
+        assert dests == [tmp_path / f'file{i}.txt' for i in range(5)]
+
+
+class TestSearchFiles:
+    """Tests for search_files helper function"""
+
+    def test_requests_only_needed_fields(self, mock_access_token):
+        """Test that search trims fields and page size on the server"""
+        with patch('o365.common.make_graph_request') as mock_request:
+            mock_request.return_value = {'value': []}
+
+            files.search_files('test-token', 'report', count=25)
+
+        url = mock_request.call_args[0][0]
+        assert '$select=id,name,size,file,folder,lastModifiedDateTime' in url
+        assert '$top=25' in url
+
+
+class TestUploadFile:
+    """Tests for upload_file helper function"""
+
+    def test_small_file_parses_json_response(self, tmp_path):
+        """Test that the upload response is parsed as JSON (true/null literals)"""
+        source = tmp_path / "small.txt"
+        source.write_text("hello")
+
+        with patch('o365.files.pooled_request') as mock_request:
+            mock_request.return_value = (201, {}, b'{"id": "item-1", "file": {"shared": true}, "description": null}')
+
+            result = files.upload_file('test-token', source, '/Documents')
+
+        assert result == {'id': 'item-1', 'file': {'shared': True}, 'description': None}
+        assert mock_request.call_args[0][1].endswith('/me/drive/root:/Documents/small.txt:/content')
+
+    def test_large_file_uses_upload_session(self, tmp_path):
+        """Test that large files are sent as sequential Content-Range fragments"""
+        source = tmp_path / "big.bin"
+        source.write_bytes(b"x" * 25)
+
+        ranges = []
+
+        def fake_pooled_request(method, url, headers, body):
+            ranges.append(headers['Content-Range'])
+            if ranges[-1].startswith('bytes 20-'):
+                return 201, {}, b'{"id": "item-1", "name": "big.bin"}'
+            return 202, {}, b'{}'
+
+        with patch('o365.files.SIMPLE_UPLOAD_LIMIT', 10), \
+             patch('o365.files.UPLOAD_CHUNK_SIZE', 10), \
+             patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files.pooled_request', side_effect=fake_pooled_request):
+            mock_request.return_value = {'uploadUrl': 'https://upload.example.com/session'}
+
+            result = files.upload_file('test-token', source, '/Documents', drive_id='drive-1')
+
+        assert mock_request.call_args[0][0] == '/drives/drive-1/root:/Documents/big.bin:/createUploadSession'
+        assert ranges == ['bytes 0-9/25', 'bytes 10-19/25', 'bytes 20-24/25']
+        assert result['id'] == 'item-1'
+
+    def test_upload_session_resumes_after_server_error(self, tmp_path):
+        """Test that a failed fragment is retried from the offset the session reports"""
+        source = tmp_path / "big.bin"
+        source.write_bytes(b"x" * 25)
+
+        calls = []
+
+        def fake_pooled_request(method, url, headers=None, body=None):
+            if method == 'GET':
+                calls.append('status')
+                return 200, {}, b'{"nextExpectedRanges": ["10-24"]}'
+            calls.append(headers['Content-Range'])
+            if calls.count('bytes 10-19/25') == 1 and calls[-1] == 'bytes 10-19/25':
+                return 503, {}, b'busy'
+            if calls[-1].startswith('bytes 20-'):
+                return 201, {}, b'{"id": "item-1"}'
+            return 202, {}, b'{}'
+
+        with patch('o365.files.SIMPLE_UPLOAD_LIMIT', 10), \
+             patch('o365.files.UPLOAD_CHUNK_SIZE', 10), \
+             patch('o365.files.time.sleep') as mock_sleep, \
+             patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files.pooled_request', side_effect=fake_pooled_request):
+            mock_request.return_value = {'uploadUrl': 'https://upload.example.com/session'}
+
+            result = files.upload_file('test-token', source, '/Documents')
+
+        assert calls == ['bytes 0-9/25', 'bytes 10-19/25', 'status', 'bytes 10-19/25', 'bytes 20-24/25']
+        mock_sleep.assert_called_once()
+        assert result['id'] == 'item-1'
+
+    def test_upload_session_gives_up_on_client_error(self, tmp_path, capsys):
+        """Test that a 4xx other than 416 is not retried"""
+        source = tmp_path / "big.bin"
+        source.write_bytes(b"x" * 25)
+
+        with patch('o365.files.SIMPLE_UPLOAD_LIMIT', 10), \
+             patch('o365.files.make_graph_request') as mock_request, \
+             patch('o365.files.pooled_request') as mock_pooled:
+            mock_request.return_value = {'uploadUrl': 'https://upload.example.com/session'}
+            mock_pooled.return_value = (403, {}, b'denied')
+
+            assert files.upload_file('test-token', source, '/Documents') is None
+
+        mock_pooled.assert_called_once()
+        assert "403" in capsys.readouterr().err
+
+
+class TestQuotePath:
+    """Tests for _quote_path helper function"""
+
+    def test_matches_urllib_quote(self):
+        """Test that encoding matches urllib.parse.quote, including non-ASCII"""
+        import urllib.parse
+        for path in ['Documents/report.pdf', 'My Files/Q1 & Q2 #1.xlsx', 'Café/日本/😀.txt', 'a~b_c-d.e/%20']:
+            assert files._quote_path(path) == urllib.parse.quote(path)
+
+    def test_upload_path_is_encoded(self, tmp_path):
+        """Test that upload destinations with spaces are percent-encoded"""
+        source = tmp_path / "my notes.txt"
+        source.write_text("hello")
+
+        with patch('o365.files.pooled_request') as mock_request:
+            mock_request.return_value = (201, {}, b'{"id": "item-1"}')
+            files.upload_file('test-token', source, '/Team Docs')
+
+        assert mock_request.call_args[0][1].endswith('/root:/Team%20Docs/my%20notes.txt:/content')
+
+
+class TestItemToStructured:
+    """Tests for _item_to_structured helper function"""
+
+    def test_file_item(self, sample_file):
+        """Test converting a file item"""
+        result = files._item_to_structured(sample_file)
+
+        assert result['id'] == sample_file['id']
+        assert result['type'] == 'file'
+        assert result['size'] == sample_file['size']
+
+    def test_folder_item_defaults(self):
+        """Test converting a sparse folder item"""
+        result = files._item_to_structured({'id': 'f1', 'name': 'Docs', 'folder': {}})
+
+        assert result['type'] == 'folder'
+        assert result['size_formatted'] == '-'
+        assert result['parent_path'] == '/'
+
+    def test_parent_path_strips_drive_root(self):
+        """Test that the drive root prefix is removed from the parent path"""
+        item = {'id': 'f1', 'name': 'a.txt', 'parentReference': {'path': '/drive/root:/Docs/Reports'}}
+
+        assert files._item_to_structured(item)['parent_path'] == '/Docs/Reports'
+
+
+class TestParseGraphDatetime:
+    """Tests for parse_graph_datetime helper function"""
+
+    def test_truncates_seven_digit_fraction(self):
+        """Test that Graph's 7-digit fractional seconds are accepted"""
+        from datetime import datetime, timezone
+        result = files.parse_graph_datetime('2024-01-15T10:30:00.1234567Z')
+        assert result == datetime(2024, 1, 15, 10, 30, 0, 123456, tzinfo=timezone.utc)
+
+    def test_without_fraction(self):
+        """Test timestamps with no fractional seconds"""
+        from datetime import datetime, timezone
+        result = files.parse_graph_datetime('2024-01-15T10:30:00Z')
+        assert result == datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+    def test_naive_and_offset_timestamps(self):
+        """Test that naive timestamps are UTC and explicit offsets are kept"""
+        from datetime import datetime, timezone, timedelta
+        assert files.parse_graph_datetime('2024-01-15T10:30:00') == \
+            datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+        assert files.parse_graph_datetime('2024-01-15T10:30:00-05:00').utcoffset() == timedelta(hours=-5)
+
+
+class TestFormatSize:
+    """Tests for format_size helper function"""
+
+    def test_unit_boundaries(self):
+        """Test values on either side of each 1024 boundary"""
+        assert files.format_size(0) == "0.0B"
+        assert files.format_size(1023) == "1023.0B"
+        assert files.format_size(1024) == "1.0KB"
+        assert files.format_size(1024 ** 2 - 1) == "1024.0KB"
+        assert files.format_size(1024 ** 2) == "1.0MB"
+        assert files.format_size(3 * 1024 ** 4) == "3.0TB"
+
+    def test_caps_at_petabytes(self):
+        """Test that sizes beyond PB stay in PB"""
+        assert files.format_size(2048 * 1024 ** 5) == "2048.0PB"
+
+
+class TestFormatFileRow:
+    """Tests for _format_file_row/_format_search_row helper functions"""
+
+    def test_file_and_folder_rows(self):
+        """Test columns for a file and for a folder without size or date"""
+        row = files._format_file_row({'_type': 'file', 'name': 'a.txt', 'size': 2048,
+                                      'lastModifiedDateTime': '2024-01-15T10:30:45Z'})
+        assert row == f"{'file':<8} {'2.0KB':<12} {'2024-01-15 10:30':<20} {'a.txt':<40}"
+
+        row = files._format_file_row({'_type': 'folder', 'name': 'Docs'})
+        assert row.split() == ['folder', '-', '-', 'Docs']
+
+    def test_search_row_adds_path(self):
+        """Test that the search row appends the parent path without the drive root prefix"""
+        item = {'_type': 'file', 'name': 'a.txt', 'size': 1,
+                'parentReference': {'path': '/drive/root:/Documents'}}
+
+        assert files._format_search_row(item) == files._format_file_row(item) + f" {'/Documents':<40}"
+
+
 class TestFormatFileSize:
     """Tests for format_file_size helper function"""
 
@@ -4,6 +4,7 @@ Tests for o365 mail commands
 
 import pytest
 from unittest.mock import patch, MagicMock
+from urllib.parse import unquote
 from o365 import mail
 
 
@@ -204,3 +205,719 @@ class TestMailMarkRead:
 
         captured = capsys.readouterr()
         assert "Would mark" in captured.out or "DRY RUN" in captured.out
+
+    def test_dry_run_selects_subject_only(self, capsys):
+        """Test that dry-run only asks Graph for the fields it prints"""
+        args = MagicMock(ids=['m1'], dry_run=True)
+        msg = {'subject': 'Hello', 'isRead': False}
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail._batch_message_requests', return_value=[('m1', msg)]) as mock_batch:
+            mail.cmd_mark_read(args)
+
+        assert mock_batch.call_args.kwargs['suffix'] == '?$select=subject,isRead'
+        assert "Hello (would mark as read)" in capsys.readouterr().out
+
+
+class TestMailSend:
+    """Tests for 'o365 mail send' command"""
+
+    def test_send_runs_module_in_process(self, monkeypatch):
+        """Test that trinoor.email runs in-process when importable"""
+        monkeypatch.setattr('sys.argv', ['o365', 'mail', 'send', '-t', 'a@example.com'])
+        args = MagicMock(passthrough=['-t', 'a@example.com'])
+        seen_argv = []
+
+        with patch('o365.mail._find_email_module', return_value=True), \
+             patch('runpy.run_module', side_effect=lambda *a, **k: seen_argv.extend(mail.sys.argv)) as mock_run, \
+             patch('o365.mail.os.execvp') as mock_exec:
+            with pytest.raises(SystemExit) as exc:
+                mail.cmd_send(args)
+
+        assert exc.value.code == 0
+        assert seen_argv == ['trinoor.email', '-t', 'a@example.com']
+        assert mock_run.call_args[0][0] == 'trinoor.email'
+        mock_exec.assert_not_called()
+
+    def test_send_falls_back_to_exec(self):
+        """Test that a separate python is exec'd when the module isn't importable"""
+        args = MagicMock(passthrough=['-t', 'a@example.com'])
+
+        with patch('o365.mail._find_email_module', return_value=False), \
+             patch('o365.mail.os.execvp') as mock_exec:
+            mail.cmd_send(args)
+
+        mock_exec.assert_called_once_with('python', ['python', '-m', 'trinoor.email', '-t', 'a@example.com'])
+
+    def test_send_without_python_on_path(self, capsys):
+        """Test the error when neither the module nor a python executable is found"""
+        args = MagicMock(passthrough=[])
+
+        with patch('o365.mail._find_email_module', return_value=False), \
+             patch('o365.mail.os.execvp', side_effect=FileNotFoundError):
+            with pytest.raises(SystemExit) as exc:
+                mail.cmd_send(args)
+
+        assert exc.value.code == 1
+        assert "trinoor.email module not found" in capsys.readouterr().err
+
+    def test_send_parser_passes_options_through(self):
+        """Test that options after 'send' are collected rather than rejected"""
+        import argparse
+        parser = argparse.ArgumentParser()
+        mail.setup_parser(parser.add_subparsers(dest='mail_command'))
+
+        args = parser.parse_args(['send', '-r', 'a@example.com', '-S', 'send', '--help'])
+
+        assert args.passthrough == ['-r', 'a@example.com', '-S', 'send', '--help']
+
+
+class TestParseGraphDatetime:
+    """Tests for parse_graph_datetime helper function"""
+
+    @pytest.fixture(autouse=True)
+    def clear_parse_cache(self):
+        """Start every test without memoized results"""
+        mail.parse_graph_datetime.cache_clear()
+        yield
+        mail.parse_graph_datetime.cache_clear()
+
+    def test_results_memoized(self):
+        """Test that repeated timestamps are parsed once"""
+        with patch('o365.mail._parse_iso_datetime', None), \
+             patch('o365.mail._FRAC_RE') as mock_re:
+            mock_re.sub.side_effect = lambda repl, s: s
+            first = mail.parse_graph_datetime('2024-01-15T10:30:45.5Z')
+            assert mail.parse_graph_datetime('2024-01-15T10:30:45.5Z') is first
+
+        mock_re.sub.assert_called_once()
+
+    def test_fallback_parser(self):
+        """Test 7-digit fractions and implicit UTC without ciso8601"""
+        from datetime import datetime, timezone
+
+        with patch('o365.mail._parse_iso_datetime', None):
+            assert mail.parse_graph_datetime('2024-01-15T10:30:45.1234567Z') == \
+                datetime(2024, 1, 15, 10, 30, 45, 123456, tzinfo=timezone.utc)
+            assert mail.parse_graph_datetime('2024-01-15T10:30:45').tzinfo == timezone.utc
+
+    def test_fast_parser_result_made_aware(self):
+        """Test that a naive result from the fast parser is treated as UTC"""
+        from datetime import datetime, timezone
+
+        with patch('o365.mail._parse_iso_datetime', return_value=datetime(2024, 1, 15, 10, 30)):
+            assert mail.parse_graph_datetime('2024-01-15T10:30:00').tzinfo == timezone.utc
+
+    def test_fast_parser_error_falls_back(self):
+        """Test that strings the fast parser rejects still go through fromisoformat"""
+        with patch('o365.mail._parse_iso_datetime', side_effect=ValueError):
+            assert mail.parse_graph_datetime('2024-01-15T10:30:45Z').hour == 10
+
+
+class TestBatchMessageRequests:
+    """Tests for batched per-message requests in archive/mark-read/read"""
+
+    def test_mark_read_uses_one_batch(self, capsys):
+        """Test that all messages are patched through graph_batch"""
+        args = MagicMock(ids=['m1', 'm2'], dry_run=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.graph_batch') as mock_batch:
+            mock_batch.return_value = {
+                '0': {'id': '0', 'status': 200, 'body': {'subject': 'First'}},
+                '1': {'id': '1', 'status': 200, 'body': {'subject': 'Second'}},
+            }
+            mail.cmd_mark_read(args)
+
+        requests = mock_batch.call_args[0][0]
+        assert [r['url'] for r in requests] == ['/me/messages/m1', '/me/messages/m2']
+        assert all(r['method'] == 'PATCH' and r['body'] == {'isRead': True} for r in requests)
+        out = capsys.readouterr().out
+        assert "Marked as read: First" in out and "Marked as read: Second" in out
+
+    def test_archive_reports_each_failure(self, capsys):
+        """Test that a failed move is reported without hiding the others"""
+        args = MagicMock(ids=['m1', 'm2'], dry_run=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.get_mail_folder_ids', return_value={'archive': 'arch'}), \
+             patch('o365.mail.graph_batch') as mock_batch:
+            mock_batch.return_value = {
+                '0': {'id': '0', 'status': 404, 'body': {'error': {}}},
+                '1': {'id': '1', 'status': 201, 'body': {'subject': 'Moved'}},
+            }
+            with pytest.raises(SystemExit):
+                mail.cmd_archive(args)
+
+        assert mock_batch.call_args[0][0][1] == {
+            'id': 1, 'method': 'POST', 'url': '/me/messages/m2/move', 'body': {'destinationId': 'arch'}}
+        captured = capsys.readouterr()
+        assert "Archived: Moved" in captured.out
+        assert "m1" in captured.err
+
+
+class TestMailFolderCache:
+    """Tests for get_mail_folder_ids helper function"""
+
+    def test_folder_ids_cached_on_disk(self):
+        """Test that the folder list is fetched once and then read from disk"""
+        page = {'value': [{'displayName': 'Archive', 'id': 'arch'}, {'displayName': 'Inbox', 'id': 'inbox'}]}
+
+        with patch('o365.mail.iter_graph_pages', return_value=iter([page])) as mock_pages:
+            assert mail.get_mail_folder_ids('test-token') == {'archive': 'arch', 'inbox': 'inbox'}
+            assert mail.get_mail_folder_ids('test-token')['archive'] == 'arch'
+
+        mock_pages.assert_called_once()
+
+    def test_names_case_folded(self):
+        """Test that folder names are matched case-insensitively, including non-ASCII"""
+        page = {'value': [{'displayName': 'ARCHIVE', 'id': 'arch'}, {'displayName': 'Straße', 'id': 'st'}]}
+
+        with patch('o365.mail.iter_graph_pages', return_value=iter([page])):
+            folders = mail.get_mail_folder_ids('test-token')
+
+        assert folders == {'archive': 'arch', 'strasse': 'st'}
+
+    def test_fetch_failure_not_cached(self):
+        """Test that a failed fetch returns None and is retried next time"""
+        with patch('o365.mail.iter_graph_pages', return_value=iter([])):
+            assert mail.get_mail_folder_ids('test-token') is None
+
+        assert mail.read_cache(mail.MAIL_FOLDERS_CACHE_NAME, 60) is None
+
+
+class TestUserDomainCache:
+    """Tests for get_user_domain helper function"""
+
+    def test_domain_cached_on_disk(self, monkeypatch):
+        """Test that /me is only asked once across processes"""
+        monkeypatch.setattr('o365.mail._USER_DOMAIN', None)
+
+        with patch('o365.mail.make_graph_request', return_value={'mail': 'ann@Example.com'}) as mock_request:
+            assert mail.get_user_domain('test-token') == 'example.com'
+            # A new process starts without the in-memory value
+            monkeypatch.setattr('o365.mail._USER_DOMAIN', None)
+            assert mail.get_user_domain('test-token') == 'example.com'
+
+        mock_request.assert_called_once()
+
+    def test_fetch_failure_not_cached(self, monkeypatch):
+        """Test that a failed /me request isn't written to disk"""
+        monkeypatch.setattr('o365.mail._USER_DOMAIN', None)
+
+        with patch('o365.mail.make_graph_request', return_value=None):
+            assert mail.get_user_domain('test-token') == ''
+
+        assert mail.read_cache(mail.USER_DOMAIN_CACHE_NAME, 60) is None
+
+
+class TestGetMessagesStream:
+    """Tests for get_messages_stream helper function"""
+
+    def test_prefetches_next_page(self):
+        """Test that the next page is requested before the current one is consumed"""
+        first = {'value': [{'id': '1'}], '@odata.nextLink': 'page-2'}
+        second = {'value': [{'id': '2'}]}
+
+        with patch('o365.mail.make_graph_request', side_effect=[first, second]) as mock_request, \
+             patch('o365.mail.submit_prefetch', wraps=mail.submit_prefetch) as mock_prefetch:
+            stream = mail.get_messages_stream('test-token')
+            assert next(stream) == [{'id': '1'}]
+            mock_prefetch.assert_called_once_with(mock_request, 'page-2', 'test-token')
+            assert list(stream) == [[{'id': '2'}]]
+
+    def test_count_limits_page_size_and_prefetch(self):
+        """Test that $top follows a small count and no page is fetched past it"""
+        with patch('o365.mail.make_graph_request') as mock_request, \
+             patch('o365.mail.submit_prefetch') as mock_prefetch:
+            mock_request.return_value = {'value': [{'id': str(i)} for i in range(5)],
+                                         '@odata.nextLink': 'page-2'}
+            result = list(mail.get_messages_stream('test-token', max_count=5))
+
+        assert result == [[{'id': str(i)} for i in range(5)]]
+        assert '$top=5&' in mock_request.call_args[0][0]
+        mock_prefetch.assert_not_called()
+
+    def test_zero_count_makes_no_request(self):
+        """Test that a count of 0 returns without asking Graph for $top=0"""
+        with patch('o365.mail.make_graph_request') as mock_request:
+            assert list(mail.get_messages_stream('test-token', max_count=0)) == []
+
+        mock_request.assert_not_called()
+
+    def test_pending_pages_cancelled_on_close(self):
+        """Test that $skip pages still in flight are cancelled when the caller stops"""
+        futures = []
+
+        def fake_submit(fn, url, access_token):
+            future = MagicMock()
+            future.result.return_value = {'value': [{'id': url}] * 50}
+            futures.append(future)
+            return future
+
+        with patch('o365.mail.submit_prefetch', side_effect=fake_submit):
+            stream = mail.get_messages_stream('test-token', max_count=500)
+            next(stream)
+            stream.close()
+
+        assert len(futures) == mail.MESSAGE_PAGE_PREFETCH
+        assert all(future.cancel.called for future in futures[1:])
+
+    def test_next_link_prefetch_cancelled_on_close(self):
+        """Test that the nextLink prefetch is cancelled when the caller stops"""
+        first = {'value': [{'id': '1'}], '@odata.nextLink': 'page-2'}
+
+        with patch('o365.mail.make_graph_request', return_value=first), \
+             patch('o365.mail.submit_prefetch') as mock_prefetch:
+            stream = mail.get_messages_stream('test-token')
+            next(stream)
+            stream.close()
+
+        mock_prefetch.return_value.cancel.assert_called_once()
+
+    def test_list_select_omits_body(self):
+        """Test that listings don't download message bodies unless asked"""
+        import urllib.parse
+
+        with patch('o365.mail.make_graph_request', return_value={'value': []}) as mock_request:
+            list(mail.get_messages_stream('test-token'))
+            list(mail.get_messages_stream('test-token', select=('id', 'body')))
+
+        selects = [urllib.parse.parse_qs(urllib.parse.urlsplit(call[0][0]).query)['$select'][0]
+                   for call in mock_request.call_args_list]
+        assert 'body' not in selects[0].split(',')
+        assert selects[1] == 'id,body'
+
+
+class TestHtmlToText:
+    """Tests for _html_to_text helper function"""
+
+    def test_strip_without_selectolax(self):
+        """Test the regex fallback when selectolax is missing"""
+        body = ('<html><head><style>p { color: red; }</style></head><body>'
+                '<p>Hi <a href="https://example.com">there</a></p><!-- note -->'
+                '<div>Fish &amp; chips<br>Line&nbsp;two</div><script>x()</script></body></html>')
+
+        with patch('o365.mail._HTMLParser', None):
+            text = mail._html_to_text(body)
+
+        assert text == 'Hi there\nFish & chips\nLine two'
+
+    def test_full_render_keeps_links(self):
+        """Test that --full-render renders with html2text, keeping links"""
+        with patch('o365.mail._HTMLParser', None):
+            text = mail._html_to_text('<p>Hi <a href="https://example.com">there</a></p>', full_render=True)
+
+        assert 'Hi [there](https://example.com)' in text
+
+    def test_html2text_state_not_shared(self):
+        """Test that a malformed body doesn't swallow the next one"""
+        with patch('o365.mail._HTMLParser', None):
+            mail._html_to_text('<style>p { color: red; }', full_render=True)
+            text = mail._html_to_text('<p>Second message</p>', full_render=True)
+
+        assert 'Second message' in text
+
+    def test_full_render_skips_selectolax(self):
+        """Test that --full-render uses html2text even when selectolax is installed"""
+        parser = MagicMock()
+
+        with patch('o365.mail._HTMLParser', parser):
+            mail._html_to_text('<p>Hi</p>', full_render=True)
+            parser.assert_not_called()
+
+            mail._html_to_text('<p>Hi</p>')
+            parser.assert_called_once_with('<p>Hi</p>')
+
+    def test_converters_imported_lazily(self):
+        """Test that importing the mail module doesn't load html2text"""
+        import os
+        import subprocess
+        import sys
+
+        env = {**os.environ, 'O365_CLIENT_ID': 'x', 'O365_TENANT': 'common'}
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, o365.mail; print('html2text' in sys.modules)"],
+            capture_output=True, text=True, env=env)
+
+        assert result.stdout.strip() == 'False'
+
+    def test_query_filters_and_search_encoded(self):
+        """Test that filter and search values are percent-encoded"""
+        import urllib.parse
+        from datetime import datetime
+
+        with patch('o365.mail.make_graph_request', return_value={'value': []}) as mock_request:
+            list(mail.get_messages_stream('test-token', since=datetime(2024, 1, 15), unread=True))
+            list(mail.get_messages_stream('test-token', search='a&b'))
+
+        first, second = (urllib.parse.parse_qs(urllib.parse.urlsplit(call[0][0]).query)
+                         for call in mock_request.call_args_list)
+        assert first['$filter'] == ['receivedDateTime ge 2024-01-15T00:00:00Z and isRead eq false']
+        assert first['$orderby'] == ['receivedDateTime desc']
+        assert first['$expand'] == [
+            'attachments($select=id,name,contentType,size,isInline,microsoft.graph.fileAttachment/contentId)'
+        ]
+        assert second['$search'] == ['"a&b"']
+        assert '$orderby' not in second
+
+
+class TestLocalMinuteStr:
+    """Tests for _local_minute_str helper function"""
+
+    def test_utc_slices_without_parsing(self):
+        """Test that UTC timestamps are sliced when local time is UTC"""
+        with patch('o365.mail._LOCAL_IS_UTC', True), \
+             patch('o365.mail.parse_graph_datetime') as mock_parse:
+            assert mail._local_minute_str('2024-01-15T10:30:45Z') == '2024-01-15 10:30'
+
+        mock_parse.assert_not_called()
+
+    def test_other_zone_converts(self):
+        """Test conversion to a non-UTC local zone"""
+        from datetime import timezone, timedelta
+
+        with patch('o365.mail._LOCAL_IS_UTC', False), \
+             patch('o365.mail._LOCAL_OFFSET', timedelta(hours=-5)), \
+             patch('o365.mail.LOCAL_TZ', timezone(timedelta(hours=-5))):
+            assert mail._local_minute_str('2024-01-15T02:30:45Z') == '2024-01-14 21:30'
+            assert mail._local_minute_str('2024-01-15T02:30:45+01:00') == '2024-01-14 20:30'
+
+
+class TestMessageSummary:
+    """Tests for format_message_summary/display_message_summary"""
+
+    def test_summary_lines(self, capsys):
+        """Test the summary layout for an unread external message with an attachment"""
+        msg = {
+            'id': 'msg-1', 'subject': 'Hello', 'isRead': False,
+            'receivedDateTime': '2024-01-15T10:30:45Z',
+            'from': {'emailAddress': {'name': 'Ann', 'address': 'ann@other.com'}},
+            'attachments': [{'isInline': False}]
+        }
+
+        with patch('o365.mail._LOCAL_IS_UTC', True):
+            mail.display_message_summary(msg, mail.make_external_check('example.com'))
+
+        assert capsys.readouterr().out == (
+            "● [2024-01-15 10:30] Ann\n"
+            "  Subject: [external] Hello 📎\n"
+            "  ID: msg-1\n\n"
+        )
+
+    def test_external_check(self):
+        """Test the bound external-sender check"""
+        is_external = mail.make_external_check('Example.com')
+
+        assert is_external('ann@other.com')
+        assert not is_external('bob@EXAMPLE.com')
+        assert not is_external('')
+        assert not is_external('no-at-sign')
+        assert not mail.make_external_check('')('ann@other.com')
+
+    def test_cmd_read_lists_each_page(self, capsys):
+        """Test that listing prints the summary of every message in a page"""
+        args = MagicMock(ids=[], count=None, folder=None, since=None, unread=False, read=False, search=None)
+        page = [{'id': f'm{i}', 'receivedDateTime': '2024-01-15T10:30:45Z'} for i in range(3)]
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.get_user_domain', return_value='example.com'), \
+             patch('o365.mail.get_messages_stream', return_value=iter([page])), \
+             patch('o365.mail.format_message_summary', side_effect=lambda m, d: f"{m['id']}\n") as mock_format:
+            mail.cmd_read(args)
+
+        assert capsys.readouterr().out.startswith("m0\nm1\nm2\n")
+        assert mock_format.call_count == 3
+
+
+class TestDisplayMessage:
+    """Tests for display_message"""
+
+    def test_body_written_in_order(self, capsys):
+        """Test that the body lands between the header and the closing rule"""
+        msg = {
+            'id': 'msg-1', 'subject': 'Hello', 'receivedDateTime': '2024-01-15T10:30:45Z',
+            'from': {'emailAddress': {'name': 'Ann', 'address': 'ann@example.com'}},
+            'body': {'contentType': 'text', 'content': 'Body text ✓'}
+        }
+
+        mail.display_message(msg)
+
+        out = capsys.readouterr().out
+        assert out.index('Subject: Hello') < out.index('Body text ✓\n') < out.rindex('=' * 80)
+
+    def test_date_in_local_time(self, capsys):
+        """Test that the received time is shown in the local zone"""
+        from datetime import timezone, timedelta
+        msg = {'id': 'msg-1', 'receivedDateTime': '2024-01-15T02:30:45Z', 'body': {'content': ''}}
+
+        with patch('o365.mail._LOCAL_IS_UTC', False), \
+             patch('o365.mail._LOCAL_OFFSET', timedelta(hours=-5)), \
+             patch('o365.mail.LOCAL_TZ', timezone(timedelta(hours=-5))):
+            mail.display_message(msg)
+
+        assert 'Date:    2024-01-14 21:30:45' in capsys.readouterr().out
+
+    def test_body_without_binary_buffer(self, monkeypatch):
+        """Test writing to a text-only stdout"""
+        import io
+        stdout = io.StringIO()
+        monkeypatch.setattr('sys.stdout', stdout)
+
+        mail._write_text('plain body')
+
+        assert stdout.getvalue() == 'plain body\n'
+
+
+class TestBatchThrottling:
+    """Tests for 429 handling in _batch_message_requests"""
+
+    def test_throttled_requests_resent(self):
+        """Test that only throttled sub-requests are resent after Retry-After"""
+        first = {
+            '0': {'id': '0', 'status': 200, 'body': {'subject': 'A'}},
+            '1': {'id': '1', 'status': 429, 'headers': {'Retry-After': '3'}},
+        }
+        second = {'1': {'id': '1', 'status': 200, 'body': {'subject': 'B'}}}
+
+        with patch('o365.mail.graph_batch', side_effect=[first, second]) as mock_batch, \
+             patch('o365.mail.time.sleep') as mock_sleep:
+            results = mail._batch_message_requests('test-token', ['m1', 'm2'])
+
+        assert results == [('m1', {'subject': 'A'}), ('m2', {'subject': 'B'})]
+        assert [r['id'] for r in mock_batch.call_args_list[1][0][0]] == [1]
+        mock_sleep.assert_called_once_with(3)
+
+    def test_gives_up_after_retries(self):
+        """Test that a request still throttled after the retries counts as failed"""
+        throttled = {'0': {'id': '0', 'status': 429, 'headers': {}}}
+
+        with patch('o365.mail.graph_batch', return_value=throttled) as mock_batch, \
+             patch('o365.mail.time.sleep'):
+            results = mail._batch_message_requests('test-token', ['m1'])
+
+        assert results == [('m1', None)]
+        assert mock_batch.call_count == mail.BATCH_THROTTLE_RETRIES + 1
+
+    def test_known_count_fetches_pages_by_skip(self):
+        """Test that a count above one page is fetched as concurrent $skip pages"""
+        def fake_request(url, access_token):
+            skip = int(url.rsplit('$skip=', 1)[1])
+            size = 50 if skip < 100 else 20  # 120 messages in the folder
+            return {'value': [{'id': str(skip + i)} for i in range(size)]}
+
+        with patch('o365.mail.make_graph_request', side_effect=fake_request) as mock_request:
+            pages = list(mail.get_messages_stream('test-token', max_count=130))
+
+        assert [len(page) for page in pages] == [50, 50, 20]
+        assert [m['id'] for m in pages[2]][:1] == ['100']
+        skips = sorted(int(call[0][0].rsplit('$skip=', 1)[1]) for call in mock_request.call_args_list)
+        assert skips == [0, 50, 100]
+
+    def test_known_count_truncates_last_page(self):
+        """Test that $skip paging stops at max_count"""
+        with patch('o365.mail.make_graph_request',
+                   side_effect=lambda url, token: {'value': [{'id': 'x'}] * 50}):
+            pages = list(mail.get_messages_stream('test-token', max_count=70))
+
+        assert [len(page) for page in pages] == [50, 20]
+
+
+class TestTextBodies:
+    """Tests for server-side body conversion and attachment markers"""
+
+    def test_read_by_id_prefers_text(self):
+        """Test that reading by ID asks Graph for text bodies unless HTML is wanted"""
+        for html, full_render, expected in ((False, False, mail._TEXT_BODY_HEADERS),
+                                            (True, False, None), (False, True, None)):
+            args = MagicMock(ids=['m1'], html=html, full_render=full_render)
+
+            with patch('o365.mail.get_access_token', return_value='test-token'), \
+                 patch('o365.mail._batch_message_requests', return_value=[('m1', {'id': 'm1'})]) as mock_batch, \
+                 patch('o365.mail.display_message'):
+                mail.cmd_read(args)
+
+            assert mock_batch.call_args.kwargs['headers'] == expected
+
+    def test_read_by_id_expands_attachment_metadata_only(self):
+        """Test that reading by ID doesn't pull attachment contents"""
+        args = MagicMock(ids=['m1'], html=False, full_render=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail._batch_message_requests', return_value=[('m1', {'id': 'm1'})]) as mock_batch, \
+             patch('o365.mail.display_message'):
+            mail.cmd_read(args)
+
+        suffix = mock_batch.call_args.kwargs['suffix']
+        assert suffix == '?' + mail._ATTACHMENTS_EXPAND_PARAM
+        # contentId is still needed for the [cid:...] lines of inline images
+        assert 'microsoft.graph.fileAttachment/contentId' in unquote(suffix)
+
+    def test_list_without_attachment_expand(self):
+        """Test that the CLI listing relies on hasAttachments instead of $expand"""
+        with patch('o365.mail.make_graph_request', return_value={'value': []}) as mock_request:
+            list(mail.get_messages_stream('test-token', attachments=False))
+
+        assert '$expand' not in mock_request.call_args[0][0]
+
+        msg = {'id': 'm1', 'receivedDateTime': '2024-01-15T10:30:45Z', 'hasAttachments': True}
+        assert '📎' in mail.format_message_summary(msg, mail.make_external_check('example.com'))
+
+
+class TestDownloadAttachment:
+    """Tests for 'o365 mail download-attachment' command"""
+
+    @staticmethod
+    def _fake_pooled(status, data):
+        """Fake pooled_request that streams data into the sink on success"""
+        def fake_pooled_request(method, url, headers=None, body=None, sink=None):
+            if status == 200:
+                sink.write(data)
+                return status, {}, b''
+            return status, {}, data
+        return fake_pooled_request
+
+    def test_streams_value_to_file(self, tmp_path, capsys):
+        """Test that the raw $value content is streamed to the output file"""
+        args = MagicMock(message_id='m1', attachment_id='a1', output=str(tmp_path), overwrite=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.make_graph_request', return_value={'name': 'report.pdf', 'size': 5}) as mock_meta, \
+             patch('o365.mail.pooled_request', side_effect=self._fake_pooled(200, b'%PDF-')) as mock_request:
+            mail.cmd_download_attachment(args)
+
+        assert (tmp_path / 'report.pdf').read_bytes() == b'%PDF-'
+        assert mock_meta.call_args[0][0].endswith('/attachments/a1?$select=name,size')
+        assert mock_request.call_args[0][1].endswith('/attachments/a1/$value')
+        assert list(tmp_path.iterdir()) == [tmp_path / 'report.pdf']
+        assert "Downloaded: report.pdf" in capsys.readouterr().out
+
+    def test_failed_download_leaves_no_file(self, tmp_path):
+        """Test that an error response exits without creating the output file"""
+        args = MagicMock(message_id='m1', attachment_id='a1', output=str(tmp_path), overwrite=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.make_graph_request', return_value={'name': 'report.pdf'}), \
+             patch('o365.mail.pooled_request', side_effect=self._fake_pooled(404, b'not found')):
+            with pytest.raises(SystemExit):
+                mail.cmd_download_attachment(args)
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestFormatSize:
+    """Tests for format_size helper function"""
+
+    def test_unit_boundaries(self):
+        """Test values on either side of each 1024 boundary"""
+        assert mail.format_size(0) == "0.0B"
+        assert mail.format_size(1023) == "1023.0B"
+        assert mail.format_size(1024) == "1.0KB"
+        assert mail.format_size(1024 ** 2 - 1) == "1024.0KB"
+        assert mail.format_size(5 * 1024 ** 2) == "5.0MB"
+
+    def test_caps_at_terabytes(self):
+        """Test that sizes beyond TB stay in TB"""
+        assert mail.format_size(2048 * 1024 ** 4) == "2048.0TB"
+
+
+class TestMessageCache:
+    """Tests for the opt-in on-disk cache of messages read by ID"""
+
+    def test_disabled_by_default(self, isolated_cache_dir):
+        """Test that nothing is written to disk unless the cache is enabled"""
+        args = MagicMock(ids=['m1'], html=False, full_render=False)
+
+        with patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.display_message'), \
+             patch('o365.mail.graph_batch', return_value={'0': {'id': '0', 'status': 200, 'body': {'id': 'm1'}}}):
+            mail.cmd_read(args)
+
+        assert not (isolated_cache_dir / mail.MESSAGE_CACHE_DIR_NAME).exists()
+
+    def test_enabled_cache_skips_request(self):
+        """Test that a cached message is shown without asking Graph again"""
+        args = MagicMock(ids=['m1', 'm2'], html=False, full_render=False)
+        first = {'0': {'id': '0', 'status': 200, 'body': {'id': 'm1'}}}
+        second = {'0': {'id': '0', 'status': 200, 'body': {'id': 'm2'}}}
+
+        with patch('o365.mail.CACHE_MESSAGES', True), \
+             patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.display_message') as mock_display, \
+             patch('o365.mail.graph_batch', side_effect=[first, second]) as mock_batch:
+            mail.cmd_read(MagicMock(ids=['m1'], html=False, full_render=False))
+            mail.cmd_read(args)
+
+        assert [r['url'] for r in mock_batch.call_args[0][0]] == [f'/me/messages/m2?{mail._ATTACHMENTS_EXPAND_PARAM}']
+        assert [c[0][0]['id'] for c in mock_display.call_args_list] == ['m1', 'm1', 'm2']
+
+    def test_expired_entries_pruned(self, isolated_cache_dir):
+        """Test that writing to the cache deletes expired message files"""
+        import os
+        import time
+        stale = isolated_cache_dir / mail.MESSAGE_CACHE_DIR_NAME / 'old.json'
+        stale.parent.mkdir(parents=True)
+        stale.write_text('{}')
+        old = time.time() - mail.MESSAGE_CACHE_TTL - 60
+        os.utime(stale, (old, old))
+
+        with patch('o365.mail.CACHE_MESSAGES', True), \
+             patch('o365.mail.get_access_token', return_value='test-token'), \
+             patch('o365.mail.display_message'), \
+             patch('o365.mail.graph_batch', return_value={'0': {'id': '0', 'status': 200, 'body': {'id': 'm1'}}}):
+            mail.cmd_read(MagicMock(ids=['m1'], html=False, full_render=False))
+
+        assert not stale.exists()
+        assert len(list(stale.parent.iterdir())) == 1
+
+    def test_body_types_cached_separately(self):
+        """Test that text and HTML fetches of a message don't share a cache entry"""
+        assert mail._message_cache_name('m1', 'text') != mail._message_cache_name('m1', 'html')
+
+
+class TestGetMessagesStructured:
+    """Tests for get_messages_structured"""
+
+    def test_without_attachment_metadata(self):
+        """Test that attachments=False skips the expand and relies on hasAttachments"""
+        msg = {'id': 'm1', 'receivedDateTime': '2024-01-15T10:30:45Z', 'hasAttachments': True,
+               'from': {'emailAddress': {'address': 'ann@other.com'}}}
+
+        with patch('o365.mail.get_user_domain', return_value='example.com'), \
+             patch('o365.mail.get_messages_stream', return_value=iter([[msg]])) as mock_stream:
+            messages = mail.get_messages_structured('test-token', attachments=False)
+
+        assert mock_stream.call_args.kwargs['attachments'] is False
+        assert messages[0]['has_real_attachments'] is True
+        assert messages[0]['is_external'] is True
+        assert 'attachments' not in messages[0]
+
+    def test_by_ids_uses_one_batch(self):
+        """Test that several messages are fetched through graph_batch"""
+        msg = {'id': 'm1', 'subject': 'Hi', 'receivedDateTime': '2024-01-15T10:30:45Z',
+               'attachments': [{'id': 'a1', 'isInline': False}]}
+
+        with patch('o365.mail.get_user_domain', return_value='example.com'), \
+             patch('o365.mail.graph_batch') as mock_batch:
+            mock_batch.return_value = {'0': {'id': '0', 'status': 200, 'body': msg},
+                                       '1': {'id': '1', 'status': 404, 'body': {}}}
+            results = mail.get_messages_by_ids_structured('test-token', ['m1', 'm2'])
+
+        mock_batch.assert_called_once()
+        # attachment metadata only, never the base64 contentBytes
+        urls = [r['url'] for r in mock_batch.call_args[0][0]]
+        assert urls == [f'/me/messages/{i}?{mail._ATTACHMENTS_EXPAND_PARAM}' for i in ('m1', 'm2')]
+        assert results[0]['subject'] == 'Hi' and results[0]['has_real_attachments']
+        assert results[1] is None
+
+    def test_by_id_expands_attachment_metadata_only(self):
+        """Test that a single message is fetched without attachment contents"""
+        msg = {'id': 'm1', 'subject': 'Hi', 'receivedDateTime': '2024-01-15T10:30:45Z',
+               'attachments': [{'id': 'a1', 'isInline': True, 'contentId': 'img1'}]}
+
+        with patch('o365.mail.get_user_domain', return_value='example.com'), \
+             patch('o365.mail.make_graph_request', return_value=msg) as mock_request:
+            result = mail.get_message_by_id_structured('test-token', 'm1')
+
+        assert mock_request.call_args[0][0] == f'{mail.GRAPH_API_BASE}/me/messages/m1?{mail._ATTACHMENTS_EXPAND_PARAM}'
+        assert result['inline_attachments'][0]['content_id'] == 'img1'